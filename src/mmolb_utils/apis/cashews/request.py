@@ -37,7 +37,7 @@ def _encode_param(param: Param) -> _RawParam:
     return param.url_param
 
 
-def _get_simple_data(endpoint: str, **params: Param) -> JsonType:
+def _get_response(endpoint: str, **params: Param) -> requests.Response:
     url = f"{CASHEWS_API}/{endpoint}"
 
     encoded_params = {param: _encode_param(value) for param, value in params.items()}
@@ -49,7 +49,16 @@ def _get_simple_data(endpoint: str, **params: Param) -> JsonType:
 
     response.raise_for_status()  # handle other errors
 
-    return response.json()
+    return response
+
+
+def _get_simple_data(endpoint: str, **params: Param) -> JsonType:
+    return _get_response(endpoint, **params).json()
+
+
+def _get_text_data(endpoint: str, **params: Param) -> str:
+    """For endpoints which can respond with something other than JSON, e.g. CSV"""
+    return _get_response(endpoint, **params).text
 
 
 type PageToken = str
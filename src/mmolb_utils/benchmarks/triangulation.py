@@ -0,0 +1,420 @@
+"""
+Measures triangulation throughput against synthetic players, without touching the network.
+
+Synthetic PlayerLite, Talk, PlayerFeed, TeamFeed, Season and Day entities are written to a temporary cache
+directory in the same format as `cached_ews`, so everything runs through the real cache layer.
+
+    python -m mmolb_utils.benchmarks.triangulation --players 10000
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import json
+import math
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import jsonlines
+
+from mmolb_utils.apis import cashews
+from mmolb_utils.apis.mmolb import EntityID
+from mmolb_utils.lib import cached_ews, feeds, triangulation
+from mmolb_utils.lib import time as mmolb_time
+from mmolb_utils.lib.attributes import (
+    ALL_ATTRIBUTES,
+    BASERUNNING_ATTRIBUTES,
+    BATTING_ATTRIBUTES,
+    DEFENSE_ATTRIBUTES,
+    PITCHING_ATTRIBUTES,
+    Attribute,
+)
+
+_CATEGORIES: dict[str, tuple[Attribute, ...]] = {
+    "Batting": BATTING_ATTRIBUTES,
+    "Pitching": PITCHING_ATTRIBUTES,
+    "Baserunning": BASERUNNING_ATTRIBUTES,
+    "Defense": DEFENSE_ATTRIBUTES,
+}
+
+_BONUSES = (5, 10, 15, 20, 25, 30)
+
+
+@dataclasses.dataclass(frozen=True)
+class SyntheticConfig:
+    players: int = 1000
+    augments: int = 20
+    """Mean number of augments per player"""
+    recomps: float = 0.5
+    """Mean number of recomps per player"""
+    talks: int = 8
+    """Mean number of Talk versions per player, not counting the latest"""
+    filler: int = 40
+    """Mean number of feed events per player which are neither augments nor recomps"""
+    seasons: int = 6
+    days: int = 240
+    s1_fraction: float = 0.2
+    """Fraction of players born in Season 1, some of whose augments only appear in their team's feed"""
+    seed: int = 0
+
+
+@dataclasses.dataclass
+class SyntheticLeague:
+    entities: dict[cashews.EntityKind, dict[EntityID, list[dict]]]
+    player_ids: list[EntityID]
+
+
+def _entity_id(rng: random.Random, timestamp: datetime | None = None) -> EntityID:
+    seconds = int(timestamp.timestamp()) if timestamp is not None else rng.getrandbits(31)
+    return f"{seconds:08x}{rng.getrandbits(64):016x}"
+
+
+def _version(kind: cashews.EntityKind, entity_id: EntityID, valid_from: datetime, data: dict) -> dict:
+    return {
+        "kind": kind.name,
+        "entity_id": entity_id,
+        "valid_from": valid_from.isoformat(),
+        "valid_to": None,
+        "data": data,
+    }
+
+
+def _stars(value: float) -> str:
+    return "*" * max(0, math.floor((value + 12.5) / 25))
+
+
+def _talk(values: dict[Attribute, float]) -> dict:
+    return {
+        category: {"quote": "", "stars": {attribute: _stars(values[attribute]) for attribute in attributes}}
+        for category, attributes in _CATEGORIES.items()
+    }
+
+
+class _Calendar:
+    def __init__(self, config: SyntheticConfig) -> None:
+        self.config = config
+        self.epoch = datetime(2025, 5, 1, tzinfo=UTC)
+        self.first_day = self.day_time(1, 1)
+        self.season_2 = self.day_time(2, 1)
+        self.last_day = self.day_time(config.seasons, config.days)
+
+    def day_time(self, season: int, day: int) -> datetime:
+        return self.epoch + timedelta(hours=(season - 1) * self.config.days + day - 1)
+
+    def season_of(self, timestamp: datetime) -> int:
+        return min(self.config.seasons, 1 + int((timestamp - self.first_day) / timedelta(hours=self.config.days)))
+
+    def random_time(self, rng: random.Random, after: datetime) -> datetime:
+        return after + timedelta(seconds=rng.uniform(0, (self.last_day - after).total_seconds()))
+
+    def entities(self, rng: random.Random) -> dict[cashews.EntityKind, dict[EntityID, list[dict]]]:
+        seasons: dict[EntityID, list[dict]] = {}
+        days: dict[EntityID, list[dict]] = {}
+
+        for season in range(1, self.config.seasons + 1):
+            day_ids = []
+            for day in range(1, self.config.days + 1):
+                day_id = _entity_id(rng)
+                day_ids.append(day_id)
+                game = {"GameID": _entity_id(rng, self.day_time(season, day)), "State": "Complete"}
+                data = {"Season": season, "Day": day, "Games": [game]}
+                days[day_id] = [_version(cashews.EntityKind.Day, day_id, self.epoch, data)]
+
+            season_id = _entity_id(rng)
+            data = {"Season": season, "Days": day_ids, "SuperstarDay1": None, "SuperstarDay2": None}
+            seasons[season_id] = [_version(cashews.EntityKind.Season, season_id, self.epoch, data)]
+
+        return {cashews.EntityKind.Season: seasons, cashews.EntityKind.Day: days}
+
+
+def _player_events(
+    rng: random.Random, config: SyntheticConfig, calendar: _Calendar, birth: datetime
+) -> list[tuple[datetime, str]]:
+    # S1 recomps would change the name that team feed augments are matched against, so they happen later
+    recomp_after = max(birth, calendar.season_2)
+    events = [
+        *((calendar.random_time(rng, birth), "augment") for _ in range(rng.randint(0, 2 * config.augments))),
+        *(
+            (calendar.random_time(rng, recomp_after), "recomp")
+            for _ in range(round(rng.uniform(0, 2 * config.recomps)))
+        ),
+        *((calendar.random_time(rng, birth), "filler") for _ in range(rng.randint(0, 2 * config.filler))),
+    ]
+    if calendar.season_of(birth) == 1:
+        team_augments = ((calendar.random_time(rng, birth), "team augment") for _ in range(rng.randint(0, 3)))
+        events.extend(event for event in team_augments if event[0] < calendar.season_2)
+    return sorted(events)
+
+
+def _player_lite(player_id: EntityID, valid_from: datetime, name: str, birth_season: int, team_id: EntityID) -> dict:
+    first, last = name.split()
+    data = {"FirstName": first, "LastName": last, "Birthseason": birth_season, "TeamID": team_id}
+    return _version(cashews.EntityKind.PlayerLite, player_id, valid_from, data)
+
+
+def _generate_player(
+    rng: random.Random,
+    config: SyntheticConfig,
+    calendar: _Calendar,
+    n: int,
+    team_id: EntityID,
+    league: SyntheticLeague,
+    team_feeds: dict[EntityID, list[dict]],
+) -> None:
+    player_id = _entity_id(rng)
+
+    if rng.random() < config.s1_fraction:
+        birth = calendar.first_day + (calendar.season_2 - calendar.first_day) * rng.uniform(0, 0.5)
+    else:
+        birth = calendar.first_day + (calendar.last_day - calendar.first_day) * rng.uniform(0, 0.5)
+    birth_season = calendar.season_of(birth)
+
+    events = _player_events(rng, config, calendar, birth)
+
+    # Talk versions are only recorded between events, and never during Season 1
+    talk_after = {
+        i
+        for i, (timestamp, _) in enumerate(events)
+        if timestamp > calendar.season_2 and rng.random() < config.talks / len(events)
+    }
+    talk_after.add(len(events) - 1)
+
+    generation = 0
+    name = f"Player{n} Gen{generation}"
+    values: dict[Attribute, float] = {attribute: rng.uniform(0, 100) for attribute in ALL_ATTRIBUTES}
+
+    player_versions = [_player_lite(player_id, birth, name, birth_season, team_id)]
+    talk_versions = [_version(cashews.EntityKind.Talk, player_id, birth, _talk(values))] if not events else []
+    feed = []
+
+    for i, (timestamp, kind) in enumerate(events):
+        entry = {"ts": timestamp.isoformat(), "type": kind, "links": [{"id": player_id, "type": "player"}]}
+        if kind in {"augment", "team augment"}:
+            attribute = rng.choice(ALL_ATTRIBUTES)
+            bonus = rng.choice(_BONUSES)
+            values[attribute] += bonus
+            entry["text"] = f"{name} gained +{bonus} {attribute}."
+        elif kind == "recomp":
+            generation += 1
+            old_name, name = name, f"Player{n} Gen{generation}"
+            values = {attribute: rng.uniform(0, 100) for attribute in ALL_ATTRIBUTES}
+            entry["text"] = f"{old_name} was Recomposed into {name}."
+            player_versions.append(
+                _player_lite(player_id, timestamp + timedelta(seconds=1), name, birth_season, team_id)
+            )
+        else:
+            entry["text"] = f"{name} hit a triple."
+
+        if kind == "team augment":
+            team_feeds[team_id].append({**entry, "type": "augment", "links": []})
+        else:
+            feed.append(entry)
+
+        if i in talk_after:
+            next_time = events[i + 1][0] if i + 1 < len(events) else timestamp + timedelta(hours=1)
+            talk_time = timestamp + (next_time - timestamp) / 2
+            talk_versions.append(_version(cashews.EntityKind.Talk, player_id, talk_time, _talk(values)))
+
+    # cached_ews stores versions from latest to earliest
+    league.entities[cashews.EntityKind.PlayerLite][player_id] = player_versions[::-1]
+    league.entities[cashews.EntityKind.Talk][player_id] = talk_versions[::-1]
+    league.entities[cashews.EntityKind.PlayerFeed][player_id] = [
+        _version(cashews.EntityKind.PlayerFeed, player_id, calendar.last_day, {"feed": feed})
+    ]
+    league.player_ids.append(player_id)
+
+
+def generate(config: SyntheticConfig) -> SyntheticLeague:
+    """
+    Simulates a league in which every player's true attributes are known,
+    so that every Talk version is consistent with their feed and triangulation should never fail.
+    """
+    rng = random.Random(config.seed)
+    calendar = _Calendar(config)
+    league = SyntheticLeague(defaultdict(dict), [])
+    league.entities.update(calendar.entities(rng))
+
+    team_ids = [_entity_id(rng) for _ in range(max(1, config.players // 13))]
+    team_feeds: dict[EntityID, list[dict]] = defaultdict(list)
+
+    for n in range(config.players):
+        _generate_player(rng, config, calendar, n, rng.choice(team_ids), league, team_feeds)
+
+    for team_id in team_ids:
+        data = {"feed": sorted(team_feeds[team_id], key=lambda entry: entry["ts"])}
+        league.entities[cashews.EntityKind.TeamFeed][team_id] = [
+            _version(cashews.EntityKind.TeamFeed, team_id, calendar.last_day, data)
+        ]
+
+    return league
+
+
+def write_cache(league: SyntheticLeague, directory: Path) -> None:
+    """Writes the league as an up-to-date `cached_ews` cache, so that nothing is fetched from chron"""
+    metadata = {}
+    for kind, kind_entities in league.entities.items():
+        with jsonlines.open(directory.joinpath(f"{kind.url_param}.jsonl"), "w") as writer:
+            for entity_id, versions in kind_entities.items():
+                writer.write({entity_id: versions})
+        metadata[kind.url_param] = datetime.now(UTC).isoformat()
+
+    with directory.joinpath("metadata.json").open("w") as meta:
+        json.dump(metadata, meta)
+
+
+def _reset_caches() -> None:
+    cached_ews._cached_entities.cache_clear()
+    cached_ews.now.cache_clear()
+    mmolb_time.timestamps.cache_clear()
+    mmolb_time.day_starts.cache_clear()
+    feeds.get_feed.cache_clear()
+    triangulation.team_augment_index.cache_clear()
+    triangulation._name_history.cache_clear()
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@dataclasses.dataclass
+class Phase:
+    name: str
+    seconds: float
+    peak_rss_mib: float
+    players: int | None = None
+
+    @property
+    def players_per_second(self) -> float | None:
+        if self.players is None or self.seconds == 0:
+            return None
+        return self.players / self.seconds
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    config: SyntheticConfig
+    phases: list[Phase] = dataclasses.field(default_factory=list)
+    errors: int = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str, players: int | None = None) -> Iterator[None]:
+        start = time.perf_counter()
+        yield
+        self.phases.append(Phase(name, time.perf_counter() - start, peak_rss_mib(), players))
+
+    def report(self) -> str:
+        lines = [
+            f"{self.config}",
+            f"{'phase':<22} {'seconds':>9} {'players/s':>11} {'peak RSS (MiB)':>15}",
+        ]
+        for phase in self.phases:
+            rate = phase.players_per_second
+            rate_str = f"{rate:>11.1f}" if rate is not None else f"{'':>11}"
+            lines.append(f"{phase.name:<22} {phase.seconds:>9.3f} {rate_str} {phase.peak_rss_mib:>15.1f}")
+        lines.append(f"{self.errors} triangulation errors")
+        return "\n".join(lines)
+
+
+def run(config: SyntheticConfig) -> BenchmarkResult:
+    result = BenchmarkResult(config)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+
+        with result.phase("generate"):
+            league = generate(config)
+        with result.phase("write cache"):
+            write_cache(league, directory)
+
+        player_ids = league.player_ids
+        del league
+
+        cached_ews.set_cache_dir(directory)
+        _reset_caches()
+        try:
+            with result.phase("load cache"):
+                for kind in (
+                    cashews.EntityKind.PlayerLite,
+                    cashews.EntityKind.Talk,
+                    cashews.EntityKind.PlayerFeed,
+                    cashews.EntityKind.TeamFeed,
+                ):
+                    cached_ews.all_entities(kind, id=())
+                mmolb_time.timestamps()
+
+            with result.phase("parse feeds", len(player_ids)):
+                for player_id in player_ids:
+                    feeds.player_feed(player_id)
+
+            histories = []
+            with result.phase("triangulate", len(player_ids)):
+                for player_id in player_ids:
+                    try:
+                        histories.append(triangulation.triangulate_attributes(player_id))
+                    except triangulation.PlayerError:
+                        result.errors += 1
+
+            with result.phase("all versions", len(player_ids)):
+                for history in histories:
+                    for _ in history.all_versions():
+                        pass
+            del histories
+
+            with result.phase("all_players (cold)", len(player_ids)):
+                triangulation.all_players(
+                    directory.joinpath("output.csv"),
+                    columnar_path=directory.joinpath("output.npz"),
+                    player_ids=player_ids,
+                )
+            with result.phase("all_players (warm)", len(player_ids)):
+                triangulation.all_players(None, player_ids=player_ids)
+        finally:
+            cached_ews.set_cache_dir(None)
+            _reset_caches()
+
+    return result
+
+
+def main() -> None:
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for field in dataclasses.fields(SyntheticConfig):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(getattr(defaults, field.name)))
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in dataclasses.fields(SyntheticConfig)
+        if getattr(args, field.name) is not None
+    }
+    result = run(dataclasses.replace(defaults, **overrides))
+    print(result.report())
+
+    if args.json is not None:
+        with args.json.open("w") as file:
+            json.dump(
+                {
+                    "config": dataclasses.asdict(result.config),
+                    "errors": result.errors,
+                    "phases": [
+                        {**dataclasses.asdict(phase), "players_per_second": phase.players_per_second}
+                        for phase in result.phases
+                    ],
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
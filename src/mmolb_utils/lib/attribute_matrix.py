@@ -0,0 +1,141 @@
+import threading
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Final
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from mmolb_utils.apis import cashews
+from mmolb_utils.apis.mmolb import EntityID
+from mmolb_utils.lib import cached_ews
+from mmolb_utils.lib.attributes import (
+    ALL_ATTRIBUTES,
+    BASERUNNING_ATTRIBUTES,
+    BATTING_ATTRIBUTES,
+    DEFENSE_ATTRIBUTES,
+    PITCHING_ATTRIBUTES,
+    Attribute,
+    Category,
+    Stars,
+)
+
+_CATEGORY_KINDS: Final[dict[cashews.EntityKind, Category]] = {
+    cashews.EntityKind.TalkBatting: "Batting",
+    cashews.EntityKind.TalkPitching: "Pitching",
+    cashews.EntityKind.TalkBaserunning: "Baserunning",
+    cashews.EntityKind.TalkDefense: "Defense",
+}
+
+_CATEGORY_ATTRIBUTES: Final[dict[Category, tuple[Attribute, ...]]] = {
+    "Batting": BATTING_ATTRIBUTES,
+    "Pitching": PITCHING_ATTRIBUTES,
+    "Baserunning": BASERUNNING_ATTRIBUTES,
+    "Defense": DEFENSE_ATTRIBUTES,
+}
+
+_COLUMNS: Final[dict[Attribute, int]] = {attribute: i for i, attribute in enumerate(ALL_ATTRIBUTES)}
+
+
+def star_value(stars: Stars) -> float:
+    return len(stars) * 0.25
+
+
+class AttributeMatrix:
+    """
+    The latest talk stars of every player, as a dense players × `ALL_ATTRIBUTES` array.
+    Each category comes from whichever of `Talk` and its own category talk is newer.
+    """
+
+    def __init__(self) -> None:
+        self.players: pd.Index = pd.Index([], name="player_id", dtype=object)
+        self.stars: npt.NDArray[np.float64] = np.empty((0, len(ALL_ATTRIBUTES)))
+        """Players × `ALL_ATTRIBUTES`, with NaN wherever `missing`"""
+        self.missing: npt.NDArray[np.bool_] = np.empty((0, len(ALL_ATTRIBUTES)), dtype=bool)
+        """Whether there is no talk for each player and attribute"""
+        self._rows: dict[EntityID, int] = {}
+        self._seen: dict[cashews.EntityKind, dict[EntityID, int]] = {}
+        self._as_of: dict[tuple[EntityID, Category], datetime] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return self.stars.nbytes + self.missing.nbytes + self.players.memory_usage()
+
+    def _latest_talks(self, kind: cashews.EntityKind) -> Iterable[tuple[EntityID, datetime, Category, dict]]:
+        """The latest talk of every player with versions of `kind` that haven't been read yet"""
+        seen = self._seen.setdefault(kind, {})
+
+        for player, versions in cached_ews.all_versions(kind).items():
+            # versions are only ever added, so a player with as many as last time is unchanged
+            if not versions or seen.get(player) == len(versions):
+                continue
+            seen[player] = len(versions)
+
+            latest = max(versions, key=lambda version: datetime.fromisoformat(version["valid_from"]))
+            valid_from = datetime.fromisoformat(latest["valid_from"])
+
+            if kind in _CATEGORY_KINDS:
+                yield player, valid_from, _CATEGORY_KINDS[kind], latest["data"]
+            else:
+                for category, talk in latest["data"].items():
+                    if category in _CATEGORY_ATTRIBUTES and talk:
+                        yield player, valid_from, category, talk
+
+    def update(self) -> int:
+        """
+        Reads any talk versions added to the talk caches since the last update, returning how many categories changed.
+        Versions fetched from chron only appear once the caches are reloaded.
+        """
+        changes: dict[tuple[EntityID, Category], dict] = {}
+
+        for kind in (cashews.EntityKind.Talk, *_CATEGORY_KINDS):
+            for player, valid_from, category, talk in self._latest_talks(kind):
+                as_of = self._as_of.get((player, category))
+                if as_of is None or valid_from >= as_of:
+                    self._as_of[player, category] = valid_from
+                    changes[player, category] = talk
+
+        new_players = list(dict.fromkeys(player for player, _ in changes if player not in self._rows))
+        if new_players:
+            self._rows.update({player: len(self._rows) + i for i, player in enumerate(new_players)})
+            self.players = self.players.append(pd.Index(new_players, name="player_id", dtype=object))
+            self.stars = np.vstack([self.stars, np.full((len(new_players), len(ALL_ATTRIBUTES)), np.nan)])
+            self.missing = np.vstack([self.missing, np.ones((len(new_players), len(ALL_ATTRIBUTES)), dtype=bool)])
+
+        for (player, category), talk in changes.items():
+            row = self._rows[player]
+            attributes = _CATEGORY_ATTRIBUTES[category]
+            columns = [_COLUMNS[attribute] for attribute in attributes]
+            stars = talk.get("stars", {})
+            values = [star_value(stars[attribute]) if attribute in stars else np.nan for attribute in attributes]
+
+            self.stars[row, columns] = values
+            self.missing[row, columns] = np.isnan(values)
+
+        return len(changes)
+
+    def frame(self, attributes: Iterable[Attribute] = ALL_ATTRIBUTES, *, complete: bool = True) -> pd.DataFrame:
+        """Players × `attributes`, leaving out players missing any of them unless `complete` is false"""
+        attributes = list(attributes)
+        columns = [_COLUMNS[attribute] for attribute in attributes]
+        frame = pd.DataFrame(self.stars[:, columns], index=self.players, columns=attributes)
+        if complete:
+            frame = frame[~self.missing[:, columns].any(axis=1)]
+        return frame
+
+
+_matrix = AttributeMatrix()
+_lock = threading.Lock()
+
+
+def attribute_matrix() -> AttributeMatrix:
+    """
+    The attribute matrix of every player, built from the talk caches on first use.
+    Later calls only read talk versions that have been added to the caches since. The caches are loaded
+    (and updated from chron) once per process, so new versions only appear after `cached_ews` reloads them,
+    e.g. after `cached_ews._cached_entities.cache_clear()`.
+    """
+    with _lock:
+        _matrix.update()
+    return _matrix
@@ -1,8 +1,9 @@
 import functools
 import json
 from collections import defaultdict
-from collections.abc import Container, Iterator
+from collections.abc import Container, Iterator, Mapping
 from datetime import UTC, datetime, timedelta
+from pathlib import Path
 
 import jsonlines
 import platformdirs
@@ -48,10 +49,24 @@ class IterCallbackIOWrapper(CallbackIOWrapper):
         yield from self.wrapper_getattr("iter")()
 
 
+_cache_dir: Path | None = None
+
+
+def set_cache_dir(value: Path | None) -> None:
+    """Overrides where cached entities are stored. `None` restores the user cache directory."""
+    global _cache_dir
+    _cache_dir = value
+
+
+def cache_dir() -> Path:
+    cache = _cache_dir if _cache_dir is not None else platformdirs.user_cache_path("mmolb_utils")
+    cache.mkdir(parents=True, exist_ok=True)
+    return cache
+
+
 @functools.lru_cache
 def _cached_entities(kind: cashews.EntityKind) -> dict[EntityID, list[dict]]:
-    cache = platformdirs.user_cache_path("mmolb_utils")
-    cache.mkdir(parents=True, exist_ok=True)
+    cache = cache_dir()
     local_file = cache.joinpath(f"{kind.url_param}.jsonl")
     metadata_file = cache.joinpath("metadata.json")
 
@@ -156,6 +171,11 @@ def all_entities(kind: cashews.EntityKind, id: Container[EntityID] | None = None
             yield from versions
 
 
+def all_versions(kind: cashews.EntityKind) -> Mapping[EntityID, list[dict]]:
+    """Every known version of every entity, by ID. Versions of an entity are only ever added."""
+    return _cached_entities(kind)
+
+
 def get_entity(kind: cashews.EntityKind, entity_id: EntityID, at: datetime | None = None) -> dict | None:
     if not _perform_cacheing:
         return next(cashews.get_entities(kind, id=entity_id, at=at), None)
@@ -185,6 +205,47 @@ def get_earliest(kind: cashews.EntityKind, entity_id: EntityID) -> dict | None:
     return min(versions, key=lambda ver: datetime.fromisoformat(ver["valid_from"]))
 
 
+def get_versions(kind: cashews.EntityKind, entity_id: EntityID) -> list[dict]:
+    """Returns every known version of the entity, from earliest to latest"""
+    if not _perform_cacheing:
+        return [dict(version) for version in cashews.get_versions(kind, id=entity_id)]
+    entities = _cached_entities(kind)
+    versions = entities[entity_id]
+    return sorted(versions, key=lambda ver: datetime.fromisoformat(ver["valid_from"]))
+
+
+class EntityTimeline:
+    """
+    An entity's versions, looked up at timestamps which only ever decrease.
+    Each lookup resumes from the previous one, so walking backwards through an entity's history
+    parses each `valid_from` once and scans each version once.
+    """
+
+    def __init__(self, versions: list[dict]) -> None:
+        self._versions = versions[::-1]
+        self._valid_from = [datetime.fromisoformat(version["valid_from"]) for version in self._versions]
+        self._index = 0
+        self._last: datetime | None = None
+
+    def at(self, timestamp: datetime) -> dict | None:
+        """The latest version from strictly before `timestamp`, or `None` if there isn't one"""
+        if self._last is not None and timestamp > self._last:
+            # not monotonic, so start over
+            self._index = 0
+        self._last = timestamp
+
+        while self._index < len(self._versions) and self._valid_from[self._index] >= timestamp:
+            self._index += 1
+
+        if self._index < len(self._versions):
+            return self._versions[self._index]
+        return None
+
+
+def timeline(kind: cashews.EntityKind, entity_id: EntityID) -> EntityTimeline:
+    return EntityTimeline(get_versions(kind, entity_id))
+
+
 @functools.lru_cache
 def now() -> datetime:
     return datetime.now(UTC)
@@ -0,0 +1,126 @@
+import bisect
+import functools
+import re
+from collections.abc import Iterator
+from datetime import datetime
+from enum import Enum, auto
+from typing import NamedTuple
+
+from mmolb_utils.apis import cashews
+from mmolb_utils.apis.mmolb import EntityID, FeedEntry
+from mmolb_utils.lib import cached_ews
+from mmolb_utils.lib.attributes import Attribute
+
+augment_pattern = re.compile(r"^(?:.*?! )?(.+) gained \+(\d+?) (\w+?)[ .]")
+recomp_pattern = re.compile(r"(.+?) was Recomposed (?:into|using) (.+?)\.")
+team_augment_pattern = re.compile(r"(.+?) gained \+(\d+?) (\w+?)\.")
+
+
+class FeedEventKind(Enum):
+    Augment = auto()
+    Recomp = auto()
+    Other = auto()
+
+
+class Augment(NamedTuple):
+    name: str
+    bonus: float
+    attribute: Attribute
+
+
+class Recomp(NamedTuple):
+    old_name: str
+    new_name: str
+
+
+class FeedEvent(NamedTuple):
+    feed_index: int
+    """Position of the event within the raw feed"""
+    timestamp: datetime
+    kind: FeedEventKind
+    augment: Augment | None
+    recomp: Recomp | None
+    links: frozenset[EntityID]
+
+
+class ParsedFeed:
+    """A feed whose events have been parsed once, in the same (chronological) order as the raw feed"""
+
+    def __init__(self, events: tuple[FeedEvent, ...]) -> None:
+        self.events = events
+        self._timestamps = [event.timestamp for event in events]
+        self.augments = tuple(event for event in events if event.kind is FeedEventKind.Augment)
+        self.recomps = tuple(event for event in events if event.kind is FeedEventKind.Recomp)
+        self.changes = tuple(event for event in events if event.kind is not FeedEventKind.Other)
+        """Augments and recomps"""
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[FeedEvent]:
+        return iter(self.events)
+
+    @property
+    def latest_timestamp(self) -> datetime | None:
+        return self._timestamps[-1] if self._timestamps else None
+
+    def until(self, timestamp: datetime) -> tuple[FeedEvent, ...]:
+        """Every event at or before `timestamp`"""
+        return self.events[: bisect.bisect_right(self._timestamps, timestamp)]
+
+
+def _parse_event(index: int, event: FeedEntry, kind: cashews.EntityKind) -> FeedEvent:
+    recomp = None
+    augment = None
+
+    if kind == cashews.EntityKind.TeamFeed:
+        # early S1 augments in team feeds didn't link to the player, so they have to be matched by name
+        if event["type"] == "augment" and (augment_match := team_augment_pattern.match(event["text"])) is not None:
+            name, bonus, attribute = augment_match.groups()
+            augment = Augment(name, float(bonus), attribute)  # type: ignore[arg-type]
+    elif (recomp_match := recomp_pattern.match(event["text"])) is not None:
+        recomp = Recomp(*recomp_match.groups())
+    elif (augment_match := augment_pattern.match(event["text"])) is not None:
+        name, bonus, attribute = augment_match.groups()
+        augment = Augment(name, float(bonus), attribute)  # type: ignore[arg-type]
+
+    if recomp is not None:
+        event_kind = FeedEventKind.Recomp
+    elif augment is not None:
+        event_kind = FeedEventKind.Augment
+    else:
+        event_kind = FeedEventKind.Other
+
+    return FeedEvent(
+        feed_index=index,
+        timestamp=datetime.fromisoformat(event["ts"]),
+        kind=event_kind,
+        augment=augment,
+        recomp=recomp,
+        links=frozenset(str(link["id"]) for link in event["links"]),
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def get_feed(kind: cashews.EntityKind, entity_id: EntityID) -> ParsedFeed:
+    """
+    The parsed `PlayerFeed` or `TeamFeed` of an entity. The most recently used feeds are kept parsed,
+    so that repeated analyses of the same entities don't touch the raw text without holding every feed twice.
+    """
+    if kind not in {cashews.EntityKind.PlayerFeed, cashews.EntityKind.TeamFeed}:
+        raise ValueError(f"{kind.name} is not a feed")
+
+    feed_data = cached_ews.get_entity(kind, entity_id)
+    if feed_data is None:
+        return ParsedFeed(())
+
+    feed: list[FeedEntry] = feed_data["data"]["feed"]
+    return ParsedFeed(tuple(_parse_event(i, event, kind) for i, event in enumerate(feed)))
+
+
+def player_feed(player_id: EntityID) -> ParsedFeed:
+    return get_feed(cashews.EntityKind.PlayerFeed, player_id)
+
+
+def team_feed(team_id: EntityID) -> ParsedFeed:
+    return get_feed(cashews.EntityKind.TeamFeed, team_id)
@@ -5,10 +5,11 @@ from tempfile import NamedTemporaryFile
 
 
 @contextmanager
-def safe_write(path: Path, *, encoding: str | None = None, newline: str | None = None):
+def safe_write(path: Path, *, encoding: str | None = None, newline: str | None = None, binary: bool = False):
+    mode = "wb" if binary else "w"
     try:
         f = None
-        with NamedTemporaryFile("w", encoding=encoding, newline=newline, dir=path.parent, delete=False) as f:  # noqa: F811
+        with NamedTemporaryFile(mode, encoding=encoding, newline=newline, dir=path.parent, delete=False) as f:  # noqa: F811
             yield f
         os.replace(f.name, path)
         f = None
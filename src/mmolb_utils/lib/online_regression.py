@@ -0,0 +1,205 @@
+import itertools
+import math
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from mmolb_utils.apis.cashews.stats_api import GroupColumn, StatFilter, get_stats_frame
+from mmolb_utils.apis.mmolb import EntityID
+from mmolb_utils.lib.regression import design_matrix
+from mmolb_utils.lib.stats.operations import StatOperation, StatOpFilter
+from mmolb_utils.lib.time import LAST_DAY, SeasonDay, next_day, today
+
+
+class OnlineOLS:
+    """
+    Ordinary least squares over a row per player, kept as the sufficient statistics X'X and X'y.
+    Replacing a player's row only costs O(terms²), so a model can follow stats as they accumulate.
+    Adding and removing players slowly accumulates rounding error, so once more than `refit_fraction`
+    of the rows have been added or removed since the statistics were last rebuilt, they're rebuilt from the rows.
+    """
+
+    def __init__(self, terms: list[str], refit_fraction: float = 0.25) -> None:
+        self.terms = terms
+        self.refit_fraction = refit_fraction
+        self._positions: dict[EntityID, int] = {}
+        self._X = np.empty((0, len(terms)))
+        self._y = np.empty(0)
+        self._present = np.empty(0, dtype=bool)
+        self._changed = 0
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        X, y = self._X[self._present], self._y[self._present]
+        self._xtx = X.T @ X
+        self._xty = X.T @ y
+        self._yty = float(y @ y)
+        self._ysum = float(y.sum())
+        self._changed = 0
+
+    def _add(self, rows: npt.NDArray[np.intp], sign: int) -> None:
+        X, y = self._X[rows], self._y[rows]
+        self._xtx += sign * (X.T @ X)
+        self._xty += sign * (X.T @ y)
+        self._yty += sign * float(y @ y)
+        self._ysum += sign * float(y.sum())
+
+    def _rows(self, players: Iterable[EntityID]) -> npt.NDArray[np.intp]:
+        new = [player for player in players if player not in self._positions]
+        if new:
+            self._positions.update({player: len(self._positions) + i for i, player in enumerate(new)})
+            self._X = np.vstack([self._X, np.zeros((len(new), len(self.terms)))])
+            self._y = np.concatenate([self._y, np.zeros(len(new))])
+            self._present = np.concatenate([self._present, np.zeros(len(new), dtype=bool)])
+        return np.array([self._positions[player] for player in players], dtype=np.intp)
+
+    def update(self, players: Sequence[EntityID], X: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> None:
+        """Sets the rows of `players`, adding any which aren't in the model yet"""
+        rows = self._rows(players)
+
+        # players whose design rows are unchanged only move X'y, along their own row
+        same = self._present[rows] & np.all(self._X[rows] == X, axis=1)
+        moved = rows[same]
+        dy = y[same] - self._y[moved]
+        self._xty += self._X[moved].T @ dy
+        self._yty += float(y[same] @ y[same] - self._y[moved] @ self._y[moved])
+        self._ysum += float(dy.sum())
+        self._y[moved] = y[same]
+
+        replaced = rows[~same]
+        self._add(replaced[self._present[replaced]], -1)
+        self._changed += len(replaced)
+        self._X[replaced] = X[~same]
+        self._y[replaced] = y[~same]
+        self._present[replaced] = True
+        self._add(replaced, 1)
+
+        self._refit_if_needed()
+
+    def remove(self, players: Iterable[EntityID]) -> None:
+        rows = self._rows([player for player in players if player in self._positions])
+        rows = rows[self._present[rows]]
+        self._add(rows, -1)
+        self._present[rows] = False
+        self._changed += len(rows)
+        self._refit_if_needed()
+
+    def _refit_if_needed(self) -> None:
+        if self._changed > self.refit_fraction * max(self.nobs, 1):
+            self._rebuild()
+
+    @property
+    def players(self) -> list[EntityID]:
+        return [player for player, row in self._positions.items() if self._present[row]]
+
+    @property
+    def nobs(self) -> int:
+        return int(self._present.sum())
+
+    @property
+    def params(self) -> pd.Series:
+        """The fitted coefficients, solved the same way as `sm.OLS` (with a pseudo-inverse)"""
+        return pd.Series(np.linalg.pinv(self._xtx, hermitian=True) @ self._xty, index=self.terms)
+
+    @property
+    def rsquared(self) -> float:
+        if self.nobs == 0:
+            return math.nan
+        tss = self._yty - self._ysum**2 / self.nobs
+        if tss <= 0:
+            return math.nan
+
+        # at the least squares solution, β'X'Xβ = β'X'y
+        rss = self._yty - float(self.params.to_numpy() @ self._xty)
+        return 1 - rss / tss
+
+
+class IncrementalRegression:
+    """
+    A regression of `stat` against `attributes` (players × attributes, e.g. from the attribute matrix) which is updated
+    as stats accumulate. Each update only pulls the days since the previous one and adds them to running totals,
+    then moves just the players who played on those days, adding or removing any who started or stopped passing
+    the filters. The model covers all time unless it's limited to a `season`, or to the days from `start` on.
+    """
+
+    def __init__(
+        self,
+        stat: StatOperation,
+        attributes: pd.DataFrame,
+        *,
+        degree: int = 1,
+        season: int | None = None,
+        start: SeasonDay | None = None,
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+        refit_fraction: float = 0.25,
+    ) -> None:
+        if season is not None and start is not None:
+            raise ValueError("A regression can be limited to a season or to the days from a start, not both")
+
+        self.stat = stat
+        self.filters = [
+            filt if isinstance(filt, StatOpFilter) else StatOpFilter.from_stat_filter(filt) for filt in filters
+        ]
+        self.start = SeasonDay(season, 0) if season is not None else start
+        """The first day whose stats are fitted, if not the first ever"""
+        self.stop = SeasonDay(season, LAST_DAY) if season is not None else None
+        """The last day whose stats are fitted, if not the latest"""
+        self.last_day: SeasonDay | None = None
+        """The last day whose stats have been added"""
+
+        keys = itertools.chain(stat.all_stat_keys(), *(filt.all_stat_keys() for filt in self.filters))
+        self._keys = list(dict.fromkeys(keys))
+        self._totals = pd.DataFrame(columns=[key.url_param for key in self._keys], dtype=np.float64)
+        self._open: pd.DataFrame | None = None
+        """The stats of `last_day` while its games may still be in progress, to be replaced by the next update"""
+        self._attributes = attributes.index
+        self._X, terms = design_matrix(attributes.to_numpy(dtype=np.float64), list(attributes.columns), degree)
+        self.ols = OnlineOLS(terms, refit_fraction)
+
+    def _pull(self, start: SeasonDay | None, end: SeasonDay) -> pd.DataFrame:
+        columns = [key.url_param for key in self._keys]
+        pulled = get_stats_frame(*self._keys, group=GroupColumn.Player, start=start, end=end)
+        new = pulled.reindex(columns=["player_id", *columns]).set_index("player_id").fillna(0).astype(np.float64)
+        return new.groupby(level=0).sum()
+
+    def update(self, end: SeasonDay | None = None) -> pd.Series:
+        """
+        Adds the stats of every day after the last update, up to and including `end` (or today).
+        Today's games may not have finished yet, so its stats are pulled again by the next update.
+        """
+        end = end or today()
+        if self.stop is not None:
+            end = min(end, self.stop)
+        if self.last_day is None:
+            start = self.start
+        else:
+            start = self.last_day if self._open is not None else next_day(self.last_day)
+        if start is not None and start > end:
+            return self.ols.params
+
+        new = self._pull(start, end)
+        changed = new.index
+        if self._open is not None:
+            self._totals = self._totals.sub(self._open, fill_value=0)
+            changed = changed.union(self._open.index)
+        self._totals = self._totals.add(new, fill_value=0)
+        if end < today():
+            self._open = None
+        else:
+            self._open = new if start == end else self._pull(end, end)
+        self.last_day = end
+
+        # only the players who played since the last update can have changed
+        totals = self._totals.loc[self._totals.index.intersection(changed)]
+        memo: dict[StatOperation, npt.NDArray[np.float64]] = {}
+        values = self.stat.evaluate(totals, memo)
+        fitted = np.isfinite(values) & totals.index.isin(self._attributes)
+        for filt in self.filters:
+            fitted &= filt.mask(totals, memo)
+
+        players = totals.index[fitted]
+        self.ols.remove(totals.index[~fitted])
+        self.ols.update(list(players), self._X[self._attributes.get_indexer(players)], values[fitted])
+        return self.ols.params
@@ -1,71 +1,125 @@
-from collections import defaultdict
+import itertools
+from collections import Counter
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 import statsmodels.api as sm
-from sklearn.preprocessing import PolynomialFeatures
+from statsmodels.regression.linear_model import RegressionResultsWrapper
 
-from mmolb_utils.apis import cashews
 from mmolb_utils.apis.cashews.stats_api import StatFilter
-from mmolb_utils.apis.mmolb import EntityID
-from mmolb_utils.lib import cached_ews
-from mmolb_utils.lib.attributes import (
-    BaserunningAttribute,
-    BattingAttribute,
-    PitchingAttribute,
-)
+from mmolb_utils.lib.attribute_matrix import attribute_matrix
+from mmolb_utils.lib.attributes import BASERUNNING_ATTRIBUTES, BATTING_ATTRIBUTES, PITCHING_ATTRIBUTES
 from mmolb_utils.lib.stats import batting, pitching
-from mmolb_utils.lib.stats.operations import StatOperation, StatTarget
+from mmolb_utils.lib.stats.operations import StatOperation, StatOpFilter, StatTarget, evaluate_many
 from mmolb_utils.lib.time import SeasonDay
 
-type Attributes[T: str] = dict[EntityID, dict[T, float]]
 
+def _term_name(attr_names: Sequence[str], combination: tuple[int, ...]) -> str:
+    powers = Counter(combination)
+    return " ".join(attr_names[i] if power == 1 else f"{attr_names[i]}^{power}" for i, power in powers.items())
 
-def get_attributes(
-    kind: cashews.AnyCategoryTalk,
-) -> Attributes:
-    return {
-        talk["entity_id"]: {attribute: len(stars) * 0.25 for attribute, stars in talk["data"]["stars"].items()}
-        for talk in cached_ews.all_entities(kind)
+
+def design_matrix(
+    attributes: npt.NDArray[np.float64], attr_names: Sequence[str], degree: int = 1
+) -> tuple[npt.NDArray[np.float64], list[str]]:
+    """
+    The design matrix of a polynomial model of rows of attributes: a constant, then every product of up to `degree`
+    attributes (in the same order as `PolynomialFeatures`). Also returns the name of each term.
+    """
+    combinations = [
+        combination
+        for power in range(1, degree + 1)
+        for combination in itertools.combinations_with_replacement(range(len(attr_names)), power)
+    ]
+
+    X = np.empty((len(attributes), len(combinations) + 1))
+    X[:, 0] = 1
+    for i, combination in enumerate(combinations, start=1):
+        X[:, i] = np.prod(attributes[:, combination], axis=1)
+
+    return X, ["const", *(_term_name(attr_names, combination) for combination in combinations)]
+
+
+def _fit(X: npt.NDArray[np.float64], y: npt.NDArray[np.float64], terms: list[str]) -> pd.DataFrame:
+    result = sm.OLS(y, X).fit()
+    return pd.DataFrame(
+        {
+            "coef": result.params,
+            "std_err": result.bse,
+            "t": result.tvalues,
+            "p_value": result.pvalues,
+            "nobs": int(result.nobs),
+            "rsquared": result.rsquared,
+        },
+        index=pd.Index(terms, name="term"),
+    )
+
+
+def regression_sweep(
+    attributes: pd.DataFrame,
+    stats: Mapping[str, StatOperation],
+    seasons: Iterable[int | None],
+    degrees: Iterable[int] = (1,),
+    *,
+    filters: Iterable[StatOpFilter | StatFilter] = (),
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    Fits every stat against `attributes` (players × attributes, as from `AttributeMatrix.frame`) in every season, with a
+    polynomial model of every degree. The stats of each season are evaluated together, and the models are fit
+    across a process pool while the next season is pulled. Models with no more players than terms are skipped.
+
+    Returns the coefficients of every model, indexed by stat, season, degree and term.
+    """
+    filters = tuple(filters)
+    designs = {
+        degree: design_matrix(attributes.to_numpy(dtype=np.float64), list(attributes.columns), degree)
+        for degree in degrees
     }
 
+    fits = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for season in seasons:
+            values = evaluate_many(stats, StatTarget.Player, season=season, filters=filters).reindex(attributes.index)
+
+            for stat_name in stats:
+                y = values[stat_name].to_numpy(dtype=np.float64)
+                fitted = np.isfinite(y)
+
+                for degree, (X, terms) in designs.items():
+                    if fitted.sum() > len(terms):
+                        fits[(stat_name, season, degree)] = executor.submit(_fit, X[fitted], y[fitted], terms)
+
+        tables = {model: fit.result() for model, fit in fits.items()}
+
+    if not tables:
+        return pd.DataFrame()
+    return pd.concat(tables, names=["stat", "season", "degree"])
+
 
 def run_regression(
-    input_attributes: dict[EntityID, dict[str, float]],
+    attributes: pd.DataFrame,
     stat: StatOperation,
     stat_name: str,
-    attr_names: list[str],
     *,
     degree: int = 1,
     start: SeasonDay | None = None,
     end: SeasonDay | None = None,
     season: int | None = None,
     filters: StatFilter = (),
-) -> None:
-    stat_dict = stat.evaluate_all(StatTarget.Player, start=start, end=end, season=season, filters=filters)
-
-    data: dict[str, list[float]] = defaultdict(list)
+) -> RegressionResultsWrapper:
+    """Fits `stat` against `attributes` (players × attributes, e.g. from the attribute matrix)"""
+    stat_values = stat.evaluate_all(StatTarget.Player, start=start, end=end, season=season, filters=filters).dropna()
+    players = attributes.index.intersection(stat_values.index).sort_values()
 
-    for player in sorted(input_attributes.keys() & stat_dict.keys()):
-        for attribute, number in input_attributes[player].items():
-            data[attribute].append(number)
-        data[stat_name].append(stat_dict[player])
+    X, terms = design_matrix(attributes.loc[players].to_numpy(dtype=np.float64), list(attributes.columns), degree)
+    y = pd.Series(stat_values[players].to_numpy(), name=stat_name)
 
-    df = pd.DataFrame(data)
-
-    X = df[attr_names]
-    y = df[stat_name]
-
-    X = sm.add_constant(X)
-
-    if degree > 1:
-        poly = PolynomialFeatures(degree=2)
-        X = poly.fit_transform(X)
-        X = pd.DataFrame(X, columns=poly.get_feature_names_out())
-
-    model = sm.OLS(y, X)
-    result = model.fit()
-
-    print(result.summary())
+    model = sm.OLS(y, pd.DataFrame(X, columns=terms))
+    return model.fit()
 
 
 def batting_regression(
@@ -76,42 +130,11 @@ def batting_regression(
     start: SeasonDay | None = None,
     end: SeasonDay | None = None,
     season: int | None = None,
-) -> None:
-    batter_attr_names = [
-        "Aiming",
-        "Contact",
-        "Cunning",
-        "Discipline",
-        "Insight",
-        "Intimidation",
-        "Lift",
-        "Vision",
-        "Determination",
-        "Wisdom",
-        "Muscle",
-        "Selflessness",
-        "Greed",
-        "Performance",
-        "Speed",
-        "Stealth",
-    ]
-
-    batting_attributes: Attributes[BattingAttribute] = get_attributes(cashews.EntityKind.TalkBatting)
-    baserunning_attributes: Attributes[BaserunningAttribute] = get_attributes(cashews.EntityKind.TalkBaserunning)
-
-    input_attributes: dict[EntityID, dict[str, float]] = {}
-
-    for player, bat_attributes in batting_attributes.items():
-        attributes: dict[str, float] = {attr: val for attr, val in bat_attributes.items()}
-        if player in baserunning_attributes:
-            attributes.update({attr: val for attr, val in baserunning_attributes[player].items()})
-            input_attributes[player] = attributes
-
-    run_regression(
-        input_attributes,
+) -> RegressionResultsWrapper:
+    return run_regression(
+        attribute_matrix().frame((*BATTING_ATTRIBUTES, *BASERUNNING_ATTRIBUTES)),
         stat,
         stat_name,
-        batter_attr_names,
         degree=degree,
         start=start,
         end=end,
@@ -128,27 +151,11 @@ def pitching_regression(
     start: SeasonDay | None = None,
     end: SeasonDay | None = None,
     season: int | None = None,
-) -> None:
-    pitcher_attr_names = [
-        "Accuracy",
-        "Rotation",
-        "Presence",
-        "Persuasion",
-        "Velocity",
-        "Control",
-        "Stuff",
-        "Defiance",
-        "Guts",
-        "Stamina",
-    ]
-
-    pitching_attributes: Attributes[PitchingAttribute] = get_attributes(cashews.EntityKind.TalkPitching)
-
-    run_regression(
-        pitching_attributes,
+) -> RegressionResultsWrapper:
+    return run_regression(
+        attribute_matrix().frame(PITCHING_ATTRIBUTES),
         stat,
         stat_name,
-        pitcher_attr_names,
         degree=degree,
         start=start,
         end=end,
@@ -158,5 +165,5 @@ def pitching_regression(
 
 
 if __name__ == "__main__":
-    batting_regression(batting.OPS, "OPS", season=5)
-    pitching_regression(pitching.ERA, "ERA", season=5)
+    print(batting_regression(batting.OPS, "OPS", season=5).summary())
+    print(pitching_regression(pitching.ERA, "ERA", season=5).summary())
@@ -1,5 +1,5 @@
 from mmolb_utils.apis.cashews.stats_api import StatKey
-from mmolb_utils.lib.stats.operations import RawStat, StatTarget
+from mmolb_utils.lib.stats.operations import PlusStat, RawStat, StatTarget
 
 # raw stats
 
@@ -166,6 +166,14 @@ basicRunsCreated = TB * (H + BB) / (AB + BB)
 bRC = basicRunsCreated
 """A basic measure of runs created"""
 
+# league-normalized stats
+
+OPS_plus = PlusStat((OBP, SLG))
+"""On-base plus slugging, normalized to the league (100 is average)"""
+
+AVG_plus = PlusStat((AVG,))
+"""Batting average, normalized to the league (100 is average)"""
+
 
 if __name__ == "__main__":
     print("BABIP")
@@ -180,9 +188,7 @@ if __name__ == "__main__":
     print("TeamAgainst")
     print(OPS.evaluate_individual(StatTarget.TeamAgainst, "6807b2e564804c8548d0e787", season=5))
 
-    for team, ops_against in sorted(
-        OPS.evaluate_all(StatTarget.TeamAgainst, season=5, filters=StatKey.PlateAppearances > 40 * 9 * 3).items(),
-        key=lambda it: it[1],
-        reverse=True,
-    ):
+    for team, ops_against in OPS.top(
+        40, StatTarget.TeamAgainst, season=5, filters=StatKey.PlateAppearances > 40 * 9 * 3
+    ).items():
         print(f"{team} - {ops_against:0.3f}")
@@ -0,0 +1,280 @@
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple, Protocol
+
+import pandas as pd
+
+from mmolb_utils.apis.cashews.stats_api import StatFilter
+from mmolb_utils.lib import cached_ews
+from mmolb_utils.lib.io import safe_write
+from mmolb_utils.lib.time import SeasonDay, today
+
+_CACHE_VERSION = 1
+
+_use_stat_cache = True
+
+MAX_AGE = timedelta(hours=1)
+"""How long stats of ranges which may still change are served for after they were pulled"""
+
+
+def set_use_stat_cache(value: bool) -> None:
+    """Whether pulled stats are persisted to, and served from, disk"""
+    global _use_stat_cache
+    _use_stat_cache = value
+
+
+class Sized(Protocol):
+    @property
+    def nbytes(self) -> int: ...
+
+
+class MemoryCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    max_bytes: int
+    currsize: int
+    nbytes: int
+    """Approximate memory held by the cached values"""
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MemoryCache:
+    """
+    Thread-safe least-recently-used cache of pulled stats (frames, or anything else with `nbytes`),
+    bounded by their approximate memory use. Use `exclusive` around a lookup and whatever pull fills it,
+    so that concurrent requests for the same key make a single pull.
+    """
+
+    def __init__(self, max_bytes: int = 1024**3) -> None:
+        self.max_bytes = max_bytes
+        self._values: OrderedDict[Hashable, pd.DataFrame | Sized] = OrderedDict()
+        self._sizes: dict[Hashable, int] = {}
+        self._pulled: dict[Hashable, datetime] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._key_users: dict[Hashable, int] = {}
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _value_nbytes(value: pd.DataFrame | Sized) -> int:
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True).sum())
+        return value.nbytes
+
+    @contextmanager
+    def exclusive(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+            self._key_users[key] = self._key_users.get(key, 0) + 1
+        try:
+            with key_lock:
+                yield
+        finally:
+            # a key's lock is only kept while someone holds or is waiting for it
+            with self._lock:
+                self._key_users[key] -= 1
+                if not self._key_users[key]:
+                    del self._key_users[key]
+                    del self._key_locks[key]
+
+    def get(self, key: Hashable, max_age: timedelta | None = None) -> pd.DataFrame | Sized | None:
+        """The value cached for `key`, unless it was first put more than `max_age` ago"""
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None and max_age is not None and datetime.now(UTC) - self._pulled[key] > max_age:
+                self._remove(key)
+                value = None
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._values.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: pd.DataFrame | Sized, *, keep_age: bool = False) -> None:
+        """
+        Caches `value`, evicting the least recently used values beyond the budget (other than this one).
+        With `keep_age`, a value which only adds to the one already cached keeps its age, so that it still expires.
+        """
+        with self._lock:
+            pulled = self._pulled.get(key) if keep_age else None
+            if key in self._values:
+                self._remove(key)
+            self._values[key] = value
+            self._pulled[key] = pulled or datetime.now(UTC)
+            self._sizes[key] = self._value_nbytes(value)
+            self._nbytes += self._sizes[key]
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _remove(self, key: Hashable) -> None:
+        del self._values[key]
+        del self._pulled[key]
+        self._nbytes -= self._sizes.pop(key)
+
+    def _evict(self) -> None:
+        # the most recent value is always kept, so that whoever just pulled it can use it
+        while self._nbytes > self.max_bytes and len(self._values) > 1:
+            self._remove(next(iter(self._values)))
+            self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._sizes.clear()
+            self._pulled.clear()
+            self._nbytes = 0
+
+    def info(self) -> MemoryCacheInfo:
+        with self._lock:
+            return MemoryCacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                max_bytes=self.max_bytes,
+                currsize=len(self._values),
+                nbytes=self._nbytes,
+            )
+
+
+memory = MemoryCache()
+
+
+def set_memory_budget(max_bytes: int) -> None:
+    """Resizes the in-memory stat cache, evicting as needed. A budget of 0 keeps only the latest value."""
+    memory.resize(max_bytes)
+
+
+def memory_cache_info() -> MemoryCacheInfo:
+    return memory.info()
+
+
+def _cache_file(
+    target: str,
+    start: SeasonDay | None,
+    end: SeasonDay | None,
+    season: int | None,
+    filters: tuple[StatFilter, ...],
+) -> Path:
+    directory = cached_ews.cache_dir().joinpath("stats")
+    directory.mkdir(exist_ok=True)
+
+    start_param = start.url_param if start is not None else "_"
+    end_param = end.url_param if end is not None else "_"
+    season_param = season if season is not None else "_"
+    filter_params = "".join(f"-{filt.stat.url_param}.{filt.op}.{filt.value}" for filt in filters)
+    return directory.joinpath(f"{target}-{season_param}-{start_param}-{end_param}{filter_params}.json")
+
+
+def is_complete(start: SeasonDay | None, end: SeasonDay | None, season: int | None) -> bool:
+    """Whether the range lies entirely within seasons that have finished, so its stats can never change"""
+    if season is not None:
+        return season < today().season
+    if end is not None:
+        return end.season < today().season
+    return False
+
+
+def max_age(start: SeasonDay | None, end: SeasonDay | None, season: int | None) -> timedelta | None:
+    """How long stats of the range can be cached for, if not forever"""
+    return None if is_complete(start, end, season) else MAX_AGE
+
+
+def _read(path: Path) -> dict | None:
+    try:
+        with path.open("r") as file:
+            cached = json.load(file)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return None
+
+    if cached.get("version") != _CACHE_VERSION:
+        return None
+
+    # stats of ranges which may still change are only served for an hour after they were pulled
+    if not cached["complete"]:
+        fresh = [
+            i
+            for i, pulled in enumerate(cached["pulled"])
+            if datetime.now(UTC) - datetime.fromisoformat(pulled) < MAX_AGE
+        ]
+        cached["columns"] = [cached["columns"][i] for i in fresh]
+        cached["pulled"] = [cached["pulled"][i] for i in fresh]
+        cached["data"] = [[row[i] for i in fresh] for row in cached["data"]]
+
+    return cached
+
+
+def _frame(cached: dict) -> pd.DataFrame:
+    frame = pd.DataFrame(cached["data"], index=cached["index"], columns=cached["columns"], dtype=float)
+    frame.index.name = "entity_id"
+    return frame
+
+
+def load(
+    target: str,
+    start: SeasonDay | None,
+    end: SeasonDay | None,
+    season: int | None,
+    filters: tuple[StatFilter, ...] = (),
+) -> pd.DataFrame:
+    """
+    The stats stored for the range, with a column for exactly the keys that have been pulled over all of it.
+    Stats pulled with server-side `filters` are stored separately, since they only include the matching entities.
+    """
+    if not _use_stat_cache or (cached := _read(_cache_file(target, start, end, season, filters))) is None:
+        return pd.DataFrame(index=pd.Index([], name="entity_id"))
+    return _frame(cached)
+
+
+def store(
+    target: str,
+    start: SeasonDay | None,
+    end: SeasonDay | None,
+    season: int | None,
+    pulled: pd.DataFrame,
+    filters: tuple[StatFilter, ...] = (),
+) -> None:
+    """Adds newly pulled stat columns to those already stored for the range"""
+    if not _use_stat_cache:
+        return
+
+    path = _cache_file(target, start, end, season, filters)
+    timestamp = datetime.now(UTC).isoformat()
+
+    if (cached := _read(path)) is not None:
+        stored = _frame(cached)
+        stored_pulled = dict(zip(cached["columns"], cached["pulled"]))
+        stored = stored.drop(columns=pulled.columns, errors="ignore")
+    else:
+        stored = pd.DataFrame()
+        stored_pulled = {}
+
+    # an entity without any of a stat recorded over the range has none of it
+    frame = stored.join(pulled, how="outer").fillna(0)
+
+    cached = {
+        "version": _CACHE_VERSION,
+        "complete": is_complete(start, end, season),
+        "pulled": [timestamp if column in pulled.columns else stored_pulled[column] for column in frame.columns],
+        **frame.to_dict(orient="split"),
+    }
+
+    with safe_write(path) as file:
+        json.dump(cached, file)
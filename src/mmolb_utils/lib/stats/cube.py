@@ -0,0 +1,185 @@
+import math
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import cast
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from mmolb_utils.apis.cashews.stats_api import GroupColumn, StatKey, get_stats_frame
+from mmolb_utils.lib.stats import cache as stat_cache
+from mmolb_utils.lib.time import LAST_DAY, SeasonDay, SpecialDay, today
+
+
+class DayCube:
+    """
+    Cumulative per-day stats of every entity over one season, so that the totals
+    over any window of days are the difference of two slices.
+    """
+
+    def __init__(
+        self,
+        entities: pd.Index,
+        days: npt.NDArray[np.float64],
+        columns: list[str],
+        cumulative: npt.NDArray[np.int64],
+        active: npt.NDArray[np.int64],
+        pulled: datetime | None = None,
+    ) -> None:
+        self.entities = entities
+        self.days = days
+        """Sorted values of every day with stats, as interpolated for special days"""
+        self.columns = columns
+        self.cumulative = cumulative
+        """Entities × (days + 1) × columns, where `cumulative[:, i]` is the total before `days[i]`"""
+        self.active = active
+        """Entities × (days + 1), counting the days before `days[i]` on which each entity has any stats"""
+        self.pulled = pulled or datetime.now(UTC)
+        """When the oldest of the columns was pulled"""
+
+    @property
+    def nbytes(self) -> int:
+        return self.cumulative.nbytes + self.active.nbytes + self.days.nbytes + self.entities.memory_usage()
+
+    @classmethod
+    def empty(cls) -> "DayCube":
+        return cls(
+            pd.Index([], name="entity_id"),
+            np.array([]),
+            [],
+            np.zeros((0, 1, 0), dtype=np.int64),
+            np.zeros((0, 1), dtype=np.int64),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: pd.DataFrame, id_key: str, columns: list[str]) -> "DayCube":
+        """Builds a cube from stat rows grouped by entity and day"""
+        entity_codes, entities = pd.factorize(rows[id_key], sort=True)
+        # CSV columns with any special days in them are read as strings
+        day_values = np.array(
+            [
+                SeasonDay(0, cast("SpecialDay", day)).day_value
+                if isinstance(day, str) and not day.isdigit()
+                else float(day)
+                for day in rows["day"]
+            ],
+            dtype=np.float64,
+        )
+        days = np.unique(day_values)
+
+        day_codes = np.searchsorted(days, day_values) + 1
+        daily = np.zeros((len(entities), len(days) + 1, len(columns)), dtype=np.int64)
+        np.add.at(daily, (entity_codes, day_codes), rows[columns].to_numpy(dtype=np.int64))
+        active = np.zeros((len(entities), len(days) + 1), dtype=np.int64)
+        active[entity_codes, day_codes] = 1
+
+        return cls(
+            pd.Index(entities, name="entity_id"),
+            days,
+            columns,
+            np.cumsum(daily, axis=1),
+            np.cumsum(active, axis=1),
+        )
+
+    def reindexed(
+        self, entities: pd.Index, days: npt.NDArray[np.float64]
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """The cumulative totals and active days for other (superset) entities and days"""
+        # days which this cube has no stats for add nothing to its running totals
+        day_positions = np.concatenate([[0], np.searchsorted(self.days, days, side="right")])
+        entity_positions = entities.get_indexer(self.entities)
+
+        cumulative = np.zeros((len(entities), len(days) + 1, len(self.columns)), dtype=np.int64)
+        cumulative[entity_positions] = self.cumulative[:, day_positions]
+        active = np.zeros((len(entities), len(days) + 1), dtype=np.int64)
+        active[entity_positions] = self.active[:, day_positions]
+        return cumulative, active
+
+    def merged(self, other: "DayCube") -> "DayCube":
+        """A cube with the columns of both, over the entities and days of either"""
+        entities = self.entities.union(other.entities)
+        days = np.union1d(self.days, other.days)
+        cumulative, active = self.reindexed(entities, days)
+        other_cumulative, other_active = other.reindexed(entities, days)
+
+        return DayCube(
+            pd.Index(entities, name="entity_id"),
+            days,
+            self.columns + other.columns,
+            np.concatenate([cumulative, other_cumulative], axis=2),
+            # an entity is active on a day if it is in either cube, which can't be told from the running counts alone
+            np.cumsum(np.diff(active, axis=1, prepend=0) | np.diff(other_active, axis=1, prepend=0), axis=1),
+            pulled=min(self.pulled, other.pulled),
+        )
+
+    def window(self, columns: list[str], start: float = -math.inf, end: float = math.inf) -> pd.DataFrame:
+        """The totals from `start` to `end`, inclusive, of each entity with any stats in that window"""
+        lo = np.searchsorted(self.days, start, side="left")
+        hi = np.searchsorted(self.days, end, side="right")
+        indices = [self.columns.index(column) for column in columns]
+        present = self.active[:, hi] > self.active[:, lo]
+
+        totals = self.cumulative[present, hi][:, indices] - self.cumulative[present, lo][:, indices]
+        return pd.DataFrame(totals, index=self.entities[present], columns=columns, dtype=float)
+
+
+def _pull(fields: list[StatKey], group: GroupColumn, id_key: str, season: int) -> DayCube:
+    # the API splits this into windows of days, since there's a row for every entity on every day
+    stats = get_stats_frame(*fields, group=(group, GroupColumn.Day), season=season)
+
+    columns = [stat.url_param for stat in fields]
+    rows = stats.reindex(columns=[id_key, "day", *columns])
+    rows[columns] = rows[columns].fillna(0)
+    return DayCube.from_rows(rows, id_key, columns)
+
+
+def season_cube(fields: Iterable[StatKey], group: GroupColumn, id_key: str, season: int) -> DayCube:
+    """
+    The day cube of a season with at least `fields`, pulling whichever are missing.
+    Cubes of seasons which are still in progress are pulled again after an hour.
+    """
+    cache_key = ("cube", group, season)
+
+    with stat_cache.memory.exclusive(cache_key):
+        cube = stat_cache.memory.get(cache_key)
+        if not isinstance(cube, DayCube):
+            cube = DayCube.empty()
+        if not stat_cache.is_complete(None, None, season) and datetime.now(UTC) - cube.pulled > stat_cache.MAX_AGE:
+            cube = DayCube.empty()
+
+        missing = [stat for stat in dict.fromkeys(fields) if stat.url_param not in cube.columns]
+        if missing:
+            cube = cube.merged(_pull(missing, group, id_key, season))
+            stat_cache.memory.put(cache_key, cube)
+
+    return cube
+
+
+def window_stats(
+    fields: list[StatKey],
+    group: GroupColumn,
+    id_key: str,
+    start: SeasonDay | None = None,
+    end: SeasonDay | None = None,
+    season: int | None = None,
+) -> pd.DataFrame:
+    """The totals of `fields` for every entity over the range, computed from the day cubes of its seasons"""
+    if season is not None:
+        start = SeasonDay(season, 0)
+        end = SeasonDay(season, LAST_DAY)
+
+    start = start or SeasonDay(0, 0)
+    end = end or today()
+    columns = [stat.url_param for stat in fields]
+
+    windows = []
+    for season in range(start.season, end.season + 1):
+        cube = season_cube(fields, group, id_key, season)
+        first = start.day_value if season == start.season else -math.inf
+        last = end.day_value if season == end.season else math.inf
+        windows.append(cube.window(columns, first, last))
+
+    totals = pd.concat(windows).groupby(level=0).sum()
+    totals.index.name = "entity_id"
+    return totals
@@ -1,25 +1,51 @@
 from __future__ import annotations
 
 import dataclasses
-import functools
 import itertools
-from collections import defaultdict
-from collections.abc import Iterable, Iterator
+import math
+from collections.abc import Iterable, Iterator, Mapping
 from enum import Enum, auto
-from typing import ClassVar, Literal
+from typing import Literal
 
-from frozendict import frozendict
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
 
 from mmolb_utils.apis.cashews.stats_api import (
     FilterableStat,
     FilterOp,
     GroupColumn,
+    StatFilter,
     StatKey,
-    StatRow,
-    get_stats,
+    get_stats_frame,
 )
 from mmolb_utils.apis.mmolb import EntityID
-from mmolb_utils.lib.time import SeasonDay
+from mmolb_utils.lib.stats import cache as stat_cache
+from mmolb_utils.lib.stats import cube as day_cube
+from mmolb_utils.lib.time import SeasonDay, today
+
+_use_local_rollup = False
+
+
+def set_use_local_rollup(value: bool) -> None:
+    """
+    Whether Player, Team and League stats are all computed locally from one pull grouped by player, team and league.
+    Only valid for stats which are sums over games, which is currently all of them.
+    """
+    global _use_local_rollup
+    _use_local_rollup = value
+
+
+_use_day_cube = False
+
+
+def set_use_day_cube(value: bool) -> None:
+    """
+    Whether Player, Team and League stats are computed from per-day cumulative totals of each season,
+    so that any window of days within pulled seasons is served locally.
+    """
+    global _use_day_cube
+    _use_day_cube = value
 
 
 @dataclasses.dataclass(frozen=True)
@@ -28,23 +54,47 @@ class StatOpFilter:
     rhs: StatOperation | float
     op: FilterOp
 
-    def applies(
-        self,
-        target: StatTarget,
-        entity_id: EntityID,
-        start: SeasonDay | None = None,
-        end: SeasonDay | None = None,
-        season: int | None = None,
-    ) -> bool:
+    def __iter__(self) -> Iterator[StatOpFilter]:
+        # makes it convenient to just accept iterables of filters
+        yield self
+
+    @classmethod
+    def from_stat_filter(cls, filt: StatFilter) -> StatOpFilter:
+        return cls(RawStat(filt.stat), filt.value, filt.op)
+
+    def all_stat_keys(self) -> Iterator[StatKey]:
+        for operand in (self.lhs, self.rhs):
+            if isinstance(operand, StatOperation):
+                yield from operand.all_stat_keys()
+
+    def pushdown(self) -> StatFilter | None:
+        """The equivalent `/stats` filter, if this only compares a raw stat with a whole number"""
+        stat: StatOperation | float
         if isinstance(self.lhs, StatOperation):
-            lhs = self.lhs.evaluate_individual(target, entity_id, start, end, season, filters=())
+            stat, value, op = self.lhs, self.rhs, self.op
         else:
-            lhs = self.lhs
+            stat, value, op = self.rhs, self.lhs, _FLIPPED_FILTER_OPS[self.op]
 
-        if isinstance(self.rhs, StatOperation):
-            rhs = self.rhs.evaluate_individual(target, entity_id, start, end, season, filters=())
-        else:
-            rhs = self.rhs
+        if not isinstance(stat, StatOperation) or (key := stat.raw_key) is None:
+            return None
+        if isinstance(value, StatOperation) or not math.isfinite(value) or value != int(value):
+            return None
+        return StatFilter(key, op, int(value))
+
+    def mask(
+        self,
+        stats: pd.DataFrame,
+        memo: dict[StatOperation, npt.NDArray[np.float64]] | None = None,
+    ) -> npt.NDArray[np.bool_]:
+        """Whether the filter applies to each row of `stats`. Comparisons with an undefined value never apply."""
+
+        def eval_operand(operand: StatOperation | float) -> npt.NDArray[np.float64]:
+            if isinstance(operand, StatOperation):
+                return operand.evaluate(stats, memo)
+            return np.full(len(stats), operand, dtype=np.float64)
+
+        lhs = eval_operand(self.lhs)
+        rhs = eval_operand(self.rhs)
 
         match self.op:
             case "eq":
@@ -59,6 +109,9 @@ class StatOpFilter:
                 return lhs <= rhs
 
 
+_FLIPPED_FILTER_OPS: dict[FilterOp, FilterOp] = {"eq": "eq", "gt": "lt", "gte": "lte", "lt": "gt", "lte": "gte"}
+
+
 class StatTarget(Enum):
     Player = auto()
     Team = auto()
@@ -66,6 +119,15 @@ class StatTarget(Enum):
     # PlayerAgainst = auto()
     TeamAgainst = auto()
     MatchmakingFactor = auto()
+    """A team's TeamAgainst value relative to that of the whole league, where 1 is average"""
+
+
+_TARGET_GROUPS: dict[StatTarget, tuple[GroupColumn, str]] = {
+    StatTarget.Player: (GroupColumn.Player, "player_id"),
+    StatTarget.Team: (GroupColumn.Team, "team_id"),
+    StatTarget.League: (GroupColumn.League, "league_id"),
+}
+"""The column to group by and the ID key of its rows for targets which are pulled directly"""
 
 
 class StatOpMixin:
@@ -136,15 +198,8 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
     rhs: Operand
     op: ArithmeticOp
 
-    _evaluation_cache: dict[EntityID, float] = dataclasses.field(
-        default_factory=dict, init=False, hash=False, repr=False, compare=False
-    )
-
-    type _CacheTuple = tuple[StatTarget, SeasonDay | None, SeasonDay | None, int | None]
-    _stat_cache: ClassVar[dict[_CacheTuple, dict[EntityID, dict[StatKey, float]]]] | None = None
-
     def _filter(self, other: object, op: FilterOp) -> StatOpFilter:
-        if not isinstance(other, StatOperation | float):
+        if not isinstance(other, StatOperation | float | int):
             return NotImplemented
 
         return StatOpFilter(self, other, op)
@@ -159,73 +214,146 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
             elif isinstance(operand, StatKey):
                 yield operand
 
+    @property
+    def raw_key(self) -> StatKey | None:
+        """The stat key, if this is just a `RawStat`"""
+        if isinstance(self.lhs, StatKey) and self.op == "+" and isinstance(self.rhs, int | float) and self.rhs == 0:
+            return self.lhs
+        return None
+
     @staticmethod
     def _simple_stat_calc(
         to_pull: list[StatKey],
-        cache: dict[EntityID, dict[StatKey, float]],
         start: SeasonDay | None,
         end: SeasonDay | None,
         season: int | None,
+        filters: tuple[StatFilter, ...],
         group: GroupColumn,
         id_key: str,
-    ) -> None:
-        stats = get_stats(*to_pull, group=group, start=start, end=end, season=season)
-        for row in stats:
-            for stat in to_pull:
-                cache[row[id_key]][stat] = row[stat.url_param]
+    ) -> pd.DataFrame:
+        stats = get_stats_frame(*to_pull, group=group, start=start, end=end, season=season, filters=filters)
+        columns = [stat.url_param for stat in to_pull]
+        return stats.reindex(columns=[id_key, *columns]).set_index(id_key)
 
     @staticmethod
     def _team_against_calc(
         to_pull: list[StatKey],
-        cache: dict[EntityID, dict[StatKey, float]],
         start: SeasonDay | None,
         end: SeasonDay | None,
         season: int | None,
-    ) -> None:
-        if season is not None:
-            start = SeasonDay(season, 0)
-            end = SeasonDay(season, 300)
-
-        assert end is not None
-        start = start or SeasonDay(0, 0)
-
-        stats = []
-        for season in range(start.season, end.season + 1):
-            # really ugly pagination stuff because oops too many rows!
-            start_day, end_day = 0, 300
-
-            if season == start.season:
-                start_day = start.day
-            if season == end.season:
-                end_day = end.day
-
-            for dates in itertools.batched(range(start_day, end_day + 1), 40):
-                stats.extend(
-                    get_stats(
-                        *to_pull,
-                        group=(GroupColumn.Team, GroupColumn.Game),
-                        start=SeasonDay(season, dates[0]),
-                        end=SeasonDay(season, dates[-1]),
-                    )
+    ) -> pd.DataFrame:
+        # the API splits this into windows of days, since there's a row for every game, as long as the range ends
+        if season is None:
+            end = end or today()
+        group = (GroupColumn.Team, GroupColumn.Game)
+        stats = get_stats_frame(*to_pull, group=group, start=start, end=end, season=season)
+
+        columns = [stat.url_param for stat in to_pull]
+        games = stats.reindex(columns=["team_id", "game_id", *columns])
+        games[columns] = games[columns].fillna(0)
+
+        # each game has a row for both of its teams, so what a team allowed is the game total minus its own row
+        against = games.groupby("game_id")[columns].transform("sum") - games[columns]
+        return against.groupby(games["team_id"]).sum()
+
+    @classmethod
+    def _rollup_calc(
+        cls,
+        to_pull: list[StatKey],
+        target: StatTarget,
+        start: SeasonDay | None,
+        end: SeasonDay | None,
+        season: int | None,
+    ) -> pd.DataFrame:
+        """Sums the stats of `target` from rows per player, team and league, which are shared by all three targets"""
+        ids = ["player_id", "team_id", "league_id"]
+        cache_key = ("rollup", start, end, season)
+
+        with stat_cache.memory.exclusive(cache_key):
+            rows = stat_cache.memory.get(cache_key, stat_cache.max_age(start, end, season))
+            if not isinstance(rows, pd.DataFrame):
+                rows = pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=ids))
+
+            missing = [stat for stat in to_pull if stat.url_param not in rows.columns]
+            if missing:
+                stats = get_stats_frame(
+                    *missing,
+                    group=(GroupColumn.Player, GroupColumn.Team, GroupColumn.League),
+                    start=start,
+                    end=end,
+                    season=season,
                 )
+                columns = [stat.url_param for stat in missing]
+                pulled = stats.reindex(columns=[*ids, *columns]).set_index(ids)
+                rows = rows.join(pulled, how="outer").fillna(0)
+                stat_cache.memory.put(cache_key, rows, keep_age=True)
 
-        team_to_game_stats: dict[EntityID, list[StatRow]] = defaultdict(list)
-        game_id_to_game_stats: dict[EntityID, list[StatRow]] = defaultdict(list)
+        _, id_key = _TARGET_GROUPS[target]
+        return rows[[stat.url_param for stat in to_pull]].groupby(level=id_key).sum()
 
-        for row in stats:
-            team_to_game_stats[row["team_id"]].append(row)
-            game_id_to_game_stats[row["game_id"]].append(row)
+    @classmethod
+    def _pull(
+        cls,
+        to_pull: list[StatKey],
+        target: StatTarget,
+        start: SeasonDay | None,
+        end: SeasonDay | None,
+        season: int | None,
+        pushdown: tuple[StatFilter, ...],
+    ) -> pd.DataFrame:
+        if target is StatTarget.TeamAgainst:
+            return cls._team_against_calc(to_pull, start, end, season)
+        if target not in _TARGET_GROUPS:
+            raise NotImplementedError
+
+        if _use_day_cube and not pushdown:
+            return day_cube.window_stats(to_pull, *_TARGET_GROUPS[target], start, end, season)
+        if _use_local_rollup and not pushdown:
+            return cls._rollup_calc(to_pull, target, start, end, season)
+        return cls._simple_stat_calc(to_pull, start, end, season, pushdown, *_TARGET_GROUPS[target])
 
-        for stat in to_pull:
-            for team, games in team_to_game_stats.items():
-                total = 0
-                for game in games:
-                    game_row = next(row for row in game_id_to_game_stats[game["game_id"]] if row != game)
-                    total += game_row[stat.url_param]
-                cache[team][stat] = total
+    @classmethod
+    def _cached_stats(
+        cls,
+        fields: Iterable[StatKey],
+        target: StatTarget,
+        start: SeasonDay | None,
+        end: SeasonDay | None,
+        season: int | None,
+        pushdown: tuple[StatFilter, ...] = (),
+        *,
+        pull: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Every stat cached for the range, pulling any of `fields` which are missing unless `pull` is false.
+        Entities are limited to those matching the `pushdown` filters, which are applied by the stats API.
+        """
+        cache_key = (target, start, end, season, pushdown)
+
+        with stat_cache.memory.exclusive(cache_key):
+            cache = stat_cache.memory.get(cache_key, stat_cache.max_age(start, end, season))
+            if not isinstance(cache, pd.DataFrame):
+                cache = stat_cache.load(target.name, start, end, season, pushdown)
+                if not cache.empty:
+                    stat_cache.memory.put(cache_key, cache)
+
+            to_pull = [stat for stat in dict.fromkeys(fields) if stat.url_param not in cache.columns]
+
+            if to_pull and pull:
+                pulled = cls._pull(to_pull, target, start, end, season, pushdown)
+
+                # windows of the day cube are cheap to recompute, so they don't each need storing
+                if not _use_day_cube:
+                    stat_cache.store(target.name, start, end, season, pulled, pushdown)
+
+                # an entity without any of a stat recorded over the range has none of it
+                cache = cache.join(pulled, how="outer").fillna(0).astype(float)
+                cache.index.name = "entity_id"
+                stat_cache.memory.put(cache_key, cache, keep_age=True)
+
+        return cache
 
     @classmethod
-    @functools.cache
     def _stats(
         cls,
         *fields: StatKey,
@@ -233,75 +361,77 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
         start: SeasonDay | None = None,
         end: SeasonDay | None = None,
         season: int | None = None,
-        filters: Iterable[StatOpFilter] = (),
-    ) -> frozendict[EntityID, frozendict[StatKey, float]]:
-        if cls._stat_cache is None:
-            cls._stat_cache = {}
-
-        cache_key = (target, start, end, season)
-        cls._stat_cache.setdefault(cache_key, defaultdict(dict))
-        cache = cls._stat_cache[cache_key]
-
-        if cache:
-            to_pull = [stat for stat in fields if stat not in next(iter(cache.values()))]
-        else:
-            to_pull = list(fields)
-
-        simple_calc = functools.partial(cls._simple_stat_calc, to_pull, cache, start, end, season)
-
-        if to_pull:
-            match target:
-                case StatTarget.Player:
-                    simple_calc(GroupColumn.Player, "player_id")
-                case StatTarget.Team:
-                    simple_calc(GroupColumn.Team, "team_id")
-                case StatTarget.League:
-                    simple_calc(GroupColumn.League, "league_id")
-                case StatTarget.TeamAgainst:
-                    cls._team_against_calc(to_pull, cache, start, end, season)
-                case _:
-                    raise NotImplementedError
-
-        return frozendict(
-            {
-                entity: frozendict(entity_stats)
-                for entity, entity_stats in cache.items()
-                if all(filt.applies(target, entity, start, end, season) for filt in filters)
-            }
-        )
-
-    def _perform_op(self, lhs: float, rhs: float) -> float:
-        match self.op:
-            case "+":
-                return lhs + rhs
-            case "-":
-                return lhs - rhs
-            case "*":
-                return lhs * rhs
-            case "/":
-                return lhs / rhs
-            case "//":
-                return lhs // rhs
-            case "%":
-                return lhs % rhs
-
-    @functools.lru_cache
-    def _evaluate_single(
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+    ) -> pd.DataFrame:
+        """
+        One row per entity (indexed by ID) and one float column per field, named by its `url_param`.
+        The frame is shared between callers, so it must not be modified.
+        """
+        op_filters = [
+            filt if isinstance(filt, StatOpFilter) else StatOpFilter.from_stat_filter(filt) for filt in filters
+        ]
+        keys = list(dict.fromkeys(itertools.chain(fields, *(filt.all_stat_keys() for filt in op_filters))))
+
+        cache = cls._cached_stats(keys, target, start, end, season, pull=False)
+
+        if not all(key.url_param in cache.columns for key in keys):
+            # TeamAgainst, rollups and day cubes are pulled at a finer grain, where filters apply to the wrong rows
+            pushdown: tuple[StatFilter, ...] = ()
+            if target is not StatTarget.TeamAgainst and not (_use_local_rollup or _use_day_cube):
+                pushed = {pushed.param_name: pushed for op_filter in op_filters if (pushed := op_filter.pushdown())}
+                pushdown = tuple(sorted(pushed.values(), key=lambda pushed: (pushed.param_name, pushed.value)))
+            cache = cls._cached_stats(keys, target, start, end, season, pushdown)
+
+        memo: dict[StatOperation, npt.NDArray[np.float64]] = {}
+        mask = np.ones(len(cache), dtype=bool)
+        for op_filter in op_filters:
+            mask &= op_filter.mask(cache, memo)
+
+        return cache.loc[mask, list(dict.fromkeys(stat.url_param for stat in fields))]
+
+    def evaluate(
         self,
-        stats: frozendict[StatKey, float],
-    ):
-        def eval_operand(operand: Operand) -> float:
+        stats: pd.DataFrame,
+        memo: dict[StatOperation, npt.NDArray[np.float64]] | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """
+        Evaluates the whole expression tree at once for every row of `stats`, as returned by `_stats`.
+        Dividing by zero, or any operation on a NaN, results in NaN for that row rather than raising.
+        Subexpressions already present in `memo` (which must only be shared between calls on the same `stats`)
+        are reused, and every evaluated node is added to it.
+        """
+        if memo is None:
+            memo = {}
+
+        if (result := memo.get(self)) is not None:
+            return result
+
+        def eval_operand(operand: Operand) -> npt.NDArray[np.float64]:
             if isinstance(operand, StatOperation):
-                return operand._evaluate_single(stats)
+                return operand.evaluate(stats, memo)
             elif isinstance(operand, StatKey):
-                return stats[operand]
+                return stats[operand.url_param].to_numpy(dtype=np.float64)
             else:
-                return operand
+                return np.full(len(stats), operand, dtype=np.float64)
 
         lhs = eval_operand(self.lhs)
         rhs = eval_operand(self.rhs)
 
-        return self._perform_op(lhs, rhs)
+        match self.op:
+            case "+":
+                result = lhs + rhs
+            case "-":
+                result = lhs - rhs
+            case "*":
+                result = lhs * rhs
+            case "/" | "//" | "%":
+                # a stat with nothing in its denominator (e.g. AVG with 0 AB) is undefined, not infinite
+                ufunc = {"/": np.true_divide, "//": np.floor_divide, "%": np.remainder}[self.op]
+                result = np.full(len(stats), np.nan)
+                ufunc(lhs, rhs, out=result, where=rhs != 0)
+
+        memo[self] = result
+        return result
 
     def evaluate_individual(
         self,
@@ -310,26 +440,16 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
         start: SeasonDay | None = None,
         end: SeasonDay | None = None,
         season: int | None = None,
-        filters: Iterable[StatOpFilter] = (),
+        filters: Iterable[StatOpFilter | StatFilter] = (),
     ) -> float:
-        # if target is StatTarget.MatchmakingFactor:
-        #     against = self._stats(
-        #         *self.all_stat_keys(),
-        #         target=StatTarget.TeamAgainst,
-        #         start=start,
-        #         end=end,
-        #         season=season,
-        #         filters=filters,
-        #     )
-        #     league = self._stats(
-        #         *self.all_stat_keys(),
-        #         target=target,
-        #         start=start,
-        #         end=end,
-        #         season=season,
-        #         filters=filters,
-        #     )
-        # else:
+        if target is StatTarget.MatchmakingFactor:
+            factors = self.evaluate_all(target, start, end, season, filters)
+            if entity_id not in factors.index:
+                raise ValueError(
+                    f"Entity ID does not exist within the constraints of {start=}, {end=}, {season=}, {filters=}"
+                )
+            return float(factors[entity_id])
+
         all_stats = self._stats(
             *self.all_stat_keys(),
             target=target,
@@ -339,12 +459,12 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
             filters=filters,
         )
 
-        if entity_id not in all_stats:
+        if entity_id not in all_stats.index:
             raise ValueError(
                 f"Entity ID does not exist within the constraints of {start=}, {end=}, {season=}, {filters=}"
             )
 
-        return self._evaluate_single(all_stats[entity_id])
+        return float(self.evaluate(all_stats.loc[[entity_id]])[0])
 
     def evaluate_all(
         self,
@@ -352,8 +472,14 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
         start: SeasonDay | None = None,
         end: SeasonDay | None = None,
         season: int | None = None,
-        filters: Iterable[StatOpFilter] = (),
-    ) -> frozendict[EntityID, float]:
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+    ) -> pd.Series:
+        """The value of this stat for every entity of `target`, indexed by entity ID. Undefined values are NaN."""
+        if target is StatTarget.MatchmakingFactor:
+            # how each team's opponents did against it, relative to how everyone did against everyone
+            factors = PlusStat((self,)).evaluate_all(StatTarget.TeamAgainst, start, end, season, filters) / 100
+            return factors.rename(str(self))
+
         all_stats = self._stats(
             *self.all_stat_keys(),
             target=target,
@@ -363,12 +489,144 @@ class StatOperation(StatOpMixin, FilterableStat[StatOpFilter]):
             filters=filters,
         )
 
-        return frozendict({entity_id: self._evaluate_single(stats) for entity_id, stats in all_stats.items()})
+        return pd.Series(self.evaluate(all_stats), index=all_stats.index, name=str(self))
+
+    def top(
+        self,
+        k: int,
+        target: StatTarget,
+        start: SeasonDay | None = None,
+        end: SeasonDay | None = None,
+        season: int | None = None,
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+    ) -> pd.Series:
+        """
+        The `k` entities with the highest values, in order.
+        Qualifying minimums are given as `filters`, e.g. `batting.PA >= 120`.
+        """
+        return top_k(self.evaluate_all(target, start, end, season, filters), k)
+
+    def bottom(
+        self,
+        k: int,
+        target: StatTarget,
+        start: SeasonDay | None = None,
+        end: SeasonDay | None = None,
+        season: int | None = None,
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+    ) -> pd.Series:
+        """The `k` entities with the lowest values, in order"""
+        return top_k(self.evaluate_all(target, start, end, season, filters), k, ascending=True)
+
+    def percentile_ranks(
+        self,
+        target: StatTarget,
+        start: SeasonDay | None = None,
+        end: SeasonDay | None = None,
+        season: int | None = None,
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+    ) -> pd.Series:
+        """
+        The fraction of entities (with a defined value) that each entity is at least as high as, from 0 to 1.
+        Entities whose value is undefined have no rank.
+        """
+        return self.evaluate_all(target, start, end, season, filters).rank(method="max", pct=True)
+
+
+@dataclasses.dataclass(frozen=True)
+class PlusStat:
+    """
+    Stats normalized against the whole league over the same range, where 100 is league average, e.g.
+    `OPS+ = 100 * (OBP / lgOBP + SLG / lgSLG - 1)` and `ERA+ = 100 * lgERA / ERA`.
+    """
+
+    components: tuple[StatOperation, ...]
+    lower_is_better: bool = False
+
+    def __str__(self) -> str:
+        return f"{' + '.join(str(component) for component in self.components)}+"
+
+    def evaluate_all(
+        self,
+        target: StatTarget = StatTarget.Player,
+        start: SeasonDay | None = None,
+        end: SeasonDay | None = None,
+        season: int | None = None,
+        filters: Iterable[StatOpFilter | StatFilter] = (),
+    ) -> pd.Series:
+        """
+        The normalized stat for every entity of `target`. Filters only limit which entities are returned;
+        the league baseline always includes everyone, and is summed from the same pull as the entities.
+        """
+        keys = sorted(
+            {key for component in self.components for key in component.all_stat_keys()}, key=lambda key: key.value
+        )
+        everyone = StatOperation._stats(*keys, target=target, start=start, end=end, season=season)
+        entities = StatOperation._stats(*keys, target=target, start=start, end=end, season=season, filters=filters)
+        league = everyone.sum().to_frame().T
+
+        entity_memo: dict[StatOperation, npt.NDArray[np.float64]] = {}
+        league_memo: dict[StatOperation, npt.NDArray[np.float64]] = {}
+        total = np.zeros(len(entities))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for component in self.components:
+                value = component.evaluate(entities, entity_memo)
+                baseline = component.evaluate(league, league_memo)[0]
+                total += baseline / value if self.lower_is_better else value / baseline
+
+        normalized = 100 * (total - (len(self.components) - 1))
+        normalized[~np.isfinite(normalized)] = np.nan
+        return pd.Series(normalized, index=entities.index, name=str(self))
+
+
+def top_k(values: pd.Series, k: int, *, ascending: bool = False) -> pd.Series:
+    """
+    The `k` highest (or lowest) of `values` in order, ignoring NaN. Only the selected values are sorted,
+    so many leaderboards can be taken from the same evaluation (e.g. each column of `evaluate_many`).
+    """
+    array = values.to_numpy(dtype=np.float64)
+    defined = np.flatnonzero(~np.isnan(array))
+    keys = array[defined] if ascending else -array[defined]
+
+    if k < len(keys):
+        selected = np.argpartition(keys, k - 1)[:k] if k > 0 else np.array([], dtype=np.intp)
+    else:
+        selected = np.arange(len(keys))
+
+    ordered = selected[np.argsort(keys[selected], kind="stable")]
+    return values.iloc[defined[ordered]]
 
 
 def RawStat(stat: StatKey) -> StatOperation:
     return StatOperation(stat, 0, "+")
 
 
+def evaluate_many(
+    stats: Mapping[str, StatOperation],
+    target: StatTarget,
+    start: SeasonDay | None = None,
+    end: SeasonDay | None = None,
+    season: int | None = None,
+    filters: Iterable[StatOpFilter | StatFilter] = (),
+) -> pd.DataFrame:
+    """
+    Evaluates several named stats for every entity of `target`, with one column per name.
+    Every stat key any of them needs is pulled together, and subexpressions they share
+    (e.g. `H` in both `AVG` and `OBP`) are only evaluated once.
+    """
+    keys = sorted({key for stat in stats.values() for key in stat.all_stat_keys()}, key=lambda key: key.value)
+
+    if target is StatTarget.MatchmakingFactor:
+        # pull every key together, so that each stat's factors are served from the cache
+        StatOperation._stats(*keys, target=StatTarget.TeamAgainst, start=start, end=end, season=season)
+        factors = {name: stat.evaluate_all(target, start, end, season, filters) for name, stat in stats.items()}
+        return pd.DataFrame(factors)
+
+    all_stats = StatOperation._stats(*keys, target=target, start=start, end=end, season=season, filters=filters)
+
+    memo: dict[StatOperation, npt.NDArray[np.float64]] = {}
+    return pd.DataFrame({name: stat.evaluate(all_stats, memo) for name, stat in stats.items()}, index=all_stats.index)
+
+
 Operand = StatOperation | StatKey | float | int
 ArithmeticOp = Literal["+", "-", "*", "/", "//", "%"]
@@ -1,5 +1,5 @@
 from mmolb_utils.apis.cashews.stats_api import StatKey
-from mmolb_utils.lib.stats.operations import RawStat
+from mmolb_utils.lib.stats.operations import PlusStat, RawStat
 
 # raw stats
 
@@ -144,3 +144,11 @@ BB_per_9 = 9 * BB / IP
 
 BBpct = BB / BF
 """Walk rate"""
+
+# league-normalized stats
+
+ERA_plus = PlusStat((ERA,), lower_is_better=True)
+"""Earned run average, normalized to the league (100 is average, higher is better)"""
+
+WHIP_plus = PlusStat((WHIP,), lower_is_better=True)
+"""Walks and hits per inning pitched, normalized to the league (100 is average, higher is better)"""
@@ -1,5 +1,6 @@
 import functools
 import itertools
+import math
 import struct
 from collections.abc import Iterator
 from datetime import UTC, datetime
@@ -33,6 +34,9 @@ INTERPOLATED_DAYS: Final[dict[SpecialDay, float]] = {
     "Event": 1,
 }
 
+LAST_DAY: Final = 301
+"""The last day of a season, as interpolated (the Holiday)"""
+
 
 class SeasonDay(NamedTuple):
     season: int
@@ -58,28 +62,36 @@ class SeasonDay(NamedTuple):
         return cls(tomorrow.season, tomorrow.day)
 
     @property
-    def _day_value(self) -> float:
+    def day_value(self) -> float:
+        """The day as a number, with special days interpolated between regular days"""
         if isinstance(self.day, int):
             return self.day
         return INTERPOLATED_DAYS[self.day]
 
     def __gt__(self, other: object) -> bool:
-        return (self.season, self._day_value) > other
+        return (self.season, self.day_value) > other
 
     def __lt__(self, other: object) -> bool:
-        return (self.season, self._day_value) < other
+        return (self.season, self.day_value) < other
 
     def __ge__(self, other: object) -> bool:
-        return (self.season, self._day_value) >= other
+        return (self.season, self.day_value) >= other
 
     def __le__(self, other: object) -> bool:
-        return (self.season, self._day_value) <= other
+        return (self.season, self.day_value) <= other
 
     def __eq__(self, other: object) -> bool:
-        return (self.season, self._day_value) == other
+        return (self.season, self.day_value) == other
 
     def __ne__(self, other: object) -> bool:
-        return (self.season, self._day_value) != other
+        return (self.season, self.day_value) != other
+
+
+def next_day(day: SeasonDay) -> SeasonDay:
+    """The day after `day`, including special days which fall between regular ones"""
+    following = math.floor(day.day_value) + 1
+    between = [(value, name) for name, value in INTERPOLATED_DAYS.items() if day.day_value < value < following]
+    return SeasonDay(day.season, min(between)[1] if between else following)
 
 
 def timestamp_from_entity_id(entity_id: EntityID) -> datetime:
@@ -114,6 +126,12 @@ def timestamps() -> dict[SeasonDay, datetime]:
     return times
 
 
+@functools.lru_cache
+def day_starts() -> list[datetime]:
+    """The timestamp of every day, in order"""
+    return sorted(timestamps().values())
+
+
 def timestamp_range(start: SeasonDay, end: SeasonDay, *, reverse: bool = False) -> Iterator[SeasonDay]:
     for season_day in sorted(timestamps().keys(), reverse=reverse):
         if start <= season_day < end:
@@ -2,17 +2,24 @@
 
 from __future__ import annotations
 
+import bisect
 import csv
 import dataclasses
 import functools
+import itertools
+import json
 import math
-import re
-from collections import defaultdict
-from collections.abc import Iterator
+import sys
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable, Iterator, Mapping
 from datetime import datetime
 from pathlib import Path
-from typing import Self
+from typing import Final, NamedTuple, Self
 
+import jsonlines
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
 from colorama import Fore
 from frozendict import frozendict
 from tqdm import tqdm
@@ -20,13 +27,14 @@ from tqdm import tqdm
 from mmolb_utils.apis import cashews
 from mmolb_utils.apis.cashews.stats_api import StatKey
 from mmolb_utils.apis.mmolb import EntityID
-from mmolb_utils.lib import cached_ews
+from mmolb_utils.lib import cached_ews, feeds
 from mmolb_utils.lib.attributes import (
     ALL_ATTRIBUTES,
     Attribute,
 )
+from mmolb_utils.lib.feeds import FeedEvent
 from mmolb_utils.lib.io import safe_write
-from mmolb_utils.lib.time import SeasonDay, timestamp_range
+from mmolb_utils.lib.time import SeasonDay, day_starts
 
 
 @dataclasses.dataclass(frozen=True, slots=True)
@@ -63,6 +71,7 @@ class Interval:
         yield self.end
 
     def __str__(self) -> str:
+        """Bounds are always printed as floats, e.g. `[0.0, 106.5)`"""
         return f"[{self.start}, {self.end})"
 
     def __add__(self, other: object) -> Interval:
@@ -99,9 +108,110 @@ class Interval:
         stars *= 25
         return cls() & cls(stars - 12.5, stars + 12.5)
 
+    @classmethod
+    def from_json(cls, data: list[float]) -> Self:
+        start, end = data
+        return cls(start, end)
+
+    def to_json(self) -> list[float]:
+        return [self.start, self.end]
+
+
+ATTRIBUTE_INDEX: Final[dict[Attribute, int]] = {attribute: i for i, attribute in enumerate(ALL_ATTRIBUTES)}
+
+type _Bounds = npt.NDArray[np.float64]
+
 
-def attribute_dict() -> dict[Attribute, Interval]:
-    return defaultdict(Interval)
+class AttributeIntervals(Mapping[Attribute, Interval]):
+    """
+    An `Interval` for every attribute, stored as start and end arrays indexed by `ATTRIBUTE_INDEX`.
+    Intersections and bonuses are applied in place, so use `frozen()` for a hashable, read-only copy.
+    """
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start: _Bounds | None = None, end: _Bounds | None = None) -> None:
+        self.start = np.zeros(len(ALL_ATTRIBUTES)) if start is None else start
+        self.end = np.full(len(ALL_ATTRIBUTES), math.inf) if end is None else end
+
+    @classmethod
+    def unbounded(cls) -> Self:
+        return cls(np.full(len(ALL_ATTRIBUTES), -math.inf), np.full(len(ALL_ATTRIBUTES), math.inf))
+
+    @classmethod
+    def uniform(cls, interval: Interval) -> Self:
+        return cls(np.full(len(ALL_ATTRIBUTES), interval.start), np.full(len(ALL_ATTRIBUTES), interval.end))
+
+    @classmethod
+    def from_intervals(cls, intervals: Mapping[Attribute, Interval]) -> Self:
+        """Attributes missing from `intervals` are left unbounded"""
+        result = cls.unbounded()
+        for attribute, interval in intervals.items():
+            i = ATTRIBUTE_INDEX[attribute]
+            result.start[i], result.end[i] = interval
+        return result
+
+    @classmethod
+    def from_stars(cls, stars: Mapping[Attribute, str | int]) -> Self:
+        """Attributes missing from `stars` are left unbounded"""
+        result = cls.unbounded()
+        indices = [ATTRIBUTE_INDEX[attribute] for attribute in stars]
+        centers = np.array([len(star) if isinstance(star, str) else star for star in stars.values()]) * 25.0
+        result.start[indices] = np.maximum(centers - 12.5, 0.0)
+        result.end[indices] = centers + 12.5
+        return result
+
+    def __getitem__(self, attribute: Attribute) -> Interval:
+        i = ATTRIBUTE_INDEX[attribute]
+        return Interval(float(self.start[i]), float(self.end[i]))
+
+    def __iter__(self) -> Iterator[Attribute]:
+        return iter(ALL_ATTRIBUTES)
+
+    def __len__(self) -> int:
+        return len(ALL_ATTRIBUTES)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({ {attribute: str(interval) for attribute, interval in self.items()} })"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AttributeIntervals):
+            return NotImplemented
+        return bool(np.array_equal(self.start, other.start) and np.array_equal(self.end, other.end))
+
+    def __hash__(self) -> int:
+        if self.start.flags.writeable or self.end.flags.writeable:
+            raise TypeError(f"unhashable type: mutable '{type(self).__name__}' (use frozen())")
+        # adding 0.0 normalizes -0.0, which compares equal to 0.0 but has different bytes
+        return hash(((self.start + 0.0).tobytes(), (self.end + 0.0).tobytes()))
+
+    def copy(self) -> AttributeIntervals:
+        return AttributeIntervals(self.start.copy(), self.end.copy())
+
+    def frozen(self) -> AttributeIntervals:
+        result = self.copy()
+        result.start.flags.writeable = False
+        result.end.flags.writeable = False
+        return result
+
+    def conflicts(self, other: AttributeIntervals) -> tuple[Attribute, ...]:
+        """The attributes for which `self` and `other` have no intersection"""
+        impossible = np.maximum(self.start, other.start) > np.minimum(self.end, other.end)
+        return tuple(ALL_ATTRIBUTES[i] for i in np.flatnonzero(impossible))
+
+    def __iand__(self, other: object) -> Self:
+        if not isinstance(other, AttributeIntervals):
+            return NotImplemented
+        if conflicts := self.conflicts(other):
+            raise ValueError(f"No intersection for {', '.join(conflicts)}")
+        np.maximum(self.start, other.start, out=self.start)
+        np.minimum(self.end, other.end, out=self.end)
+        return self
+
+    def shift(self, attribute: Attribute, amount: float) -> None:
+        i = ATTRIBUTE_INDEX[attribute]
+        self.start[i] += amount
+        self.end[i] += amount
 
 
 class PlayerError(ValueError):
@@ -115,7 +225,7 @@ class PlayerError(ValueError):
 class PlayerHistory:
     player_id: EntityID
     working_name: str = ""
-    working_attributes: dict[Attribute, Interval] = dataclasses.field(default_factory=attribute_dict)
+    working_attributes: AttributeIntervals = dataclasses.field(default_factory=AttributeIntervals)
     recomps: list[PlayerComposition] = dataclasses.field(default_factory=list)
     bonus_history: dict[datetime, list[tuple[Attribute, float]]] = dataclasses.field(
         default_factory=lambda: defaultdict(list)
@@ -123,36 +233,34 @@ class PlayerHistory:
 
     def _update_attributes(
         self,
-        attributes: dict[Attribute, Interval],
+        attributes: AttributeIntervals,
         name: str | None = None,
     ) -> None:
-        for attribute, interval in attributes.items():
-            try:
-                self.working_attributes[attribute] &= interval
-            except ValueError as e:
-                raise PlayerError(
-                    f"Error with {attribute}: {e}",
-                    player_id=self.player_id,
-                    player_name=name or self.working_name,
-                ) from e
+        if conflicts := self.working_attributes.conflicts(attributes):
+            attribute = conflicts[0]
+            raise PlayerError(
+                f"Error with {attribute}: "
+                f"No intersection between {self.working_attributes[attribute]} and {attributes[attribute]}",
+                player_id=self.player_id,
+                player_name=name or self.working_name,
+            )
+        self.working_attributes &= attributes
 
     def update_from_talk(self, talk: dict[str, dict]) -> None:
-        attributes: dict[Attribute, Interval] = {}
+        stars: dict[Attribute, str] = {}
         for _, group_talk in talk.items():
-            for attribute, star in group_talk["stars"].items():
-                attributes[attribute] = Interval.from_stars(star)
-        self._update_attributes(attributes)
+            stars.update(group_talk["stars"])
+        self._update_attributes(AttributeIntervals.from_stars(stars))
 
     def update_from_birth(self, birthdate: datetime, name: str | None = None) -> None:
         if birthdate < SeasonDay(1, 1).timestamp:
             return
 
         interval = Interval(0, 106.5)  # what?
-        attributes = {attribute: interval for attribute in ALL_ATTRIBUTES}
-        self._update_attributes(attributes, name)
+        self._update_attributes(AttributeIntervals.uniform(interval), name)
 
     def add_bonus(self, timestamp: datetime, attribute: Attribute, bonus: float) -> None:
-        self.working_attributes[attribute] -= bonus
+        self.working_attributes.shift(attribute, -bonus)
         self.bonus_history[timestamp].append((attribute, bonus))
 
     def save_composition(self, birth: datetime | None, name: str) -> None:
@@ -178,13 +286,11 @@ class PlayerHistory:
             player_id=self.player_id,
             player_name=name,
             lifetime=(birth, death),
-            initial_attributes=frozendict(
-                {attribute: self.working_attributes[attribute] for attribute in ALL_ATTRIBUTES}
-            ),
+            initial_attributes=self.working_attributes.frozen(),
             bonus_history=bonuses,
         )
         self.recomps.append(recomp)
-        self.working_attributes = attribute_dict()
+        self.working_attributes = AttributeIntervals()
 
     def get_composition(self, timestamp: datetime | None = None) -> PlayerComposition:
         if timestamp is None:
@@ -199,26 +305,53 @@ class PlayerHistory:
         for comp in self.recomps:
             yield from comp.all_versions()
 
+    def to_json(self) -> dict:
+        return {
+            "player_id": self.player_id,
+            "working_name": self.working_name,
+            "recomps": [comp.to_json() for comp in self.recomps],
+            "bonus_history": _bonuses_to_json(self.bonus_history),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> Self:
+        bonus_history: dict[datetime, list[tuple[Attribute, float]]] = defaultdict(list)
+        for time, bonuses in _bonuses_from_json(data["bonus_history"]).items():
+            bonus_history[time].extend(bonuses)
+
+        return cls(
+            player_id=data["player_id"],
+            working_name=data["working_name"],
+            recomps=[PlayerComposition.from_json(comp) for comp in data["recomps"]],
+            bonus_history=bonus_history,
+        )
+
 
 @dataclasses.dataclass(frozen=True)
 class PlayerComposition:
     player_id: EntityID
     player_name: str
     lifetime: tuple[datetime, datetime | None]
-    initial_attributes: frozendict[Attribute, Interval]
+    initial_attributes: AttributeIntervals
     bonus_history: frozendict[datetime, tuple[tuple[Attribute, float], ...]]
 
-    @functools.lru_cache
     def _get_snapshot(self, timestamp: datetime) -> PlayerSnapshot:
+        snapshot = _snapshot_cache.get(self, timestamp)
+        if snapshot is None:
+            snapshot = self._build_snapshot(timestamp)
+            _snapshot_cache.put(self, timestamp, snapshot)
+        return snapshot
+
+    def _build_snapshot(self, timestamp: datetime) -> PlayerSnapshot:
         birth, death = self.lifetime
         if timestamp < birth or ((death is not None) and timestamp > death):
             raise ValueError(f"Player {self.player_id} did not exist at {timestamp}")
 
-        attributes = dict(self.initial_attributes)
+        attributes = self.initial_attributes.copy()
         for bonus_time, bonuses in self.bonus_history.items():
             if birth < bonus_time <= timestamp:
                 for attribute, bonus in bonuses:
-                    attributes[attribute] += bonus
+                    attributes.shift(attribute, bonus)
 
         player = cached_ews.get_entity(cashews.EntityKind.PlayerLite, self.player_id, timestamp)
         name = f"{player['data']['FirstName']} {player['data']['LastName']}"
@@ -229,7 +362,34 @@ class PlayerComposition:
             # chron_valid_from=datetime.fromisoformat(player["valid_from"]),
             valid_from=None,
             valid_to=None,
-            base_attributes=frozendict(attributes),
+            base_attributes=attributes.frozen(),
+        )
+
+    def to_json(self) -> dict:
+        birth, death = self.lifetime
+        return {
+            "player_id": self.player_id,
+            "player_name": self.player_name,
+            "lifetime": [birth.isoformat(), None if death is None else death.isoformat()],
+            "initial_attributes": {
+                attribute: interval.to_json() for attribute, interval in self.initial_attributes.items()
+            },
+            "bonus_history": _bonuses_to_json(self.bonus_history),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> Self:
+        birth, death = data["lifetime"]
+        return cls(
+            player_id=data["player_id"],
+            player_name=data["player_name"],
+            lifetime=(datetime.fromisoformat(birth), None if death is None else datetime.fromisoformat(death)),
+            initial_attributes=AttributeIntervals.from_intervals(
+                {attribute: Interval.from_json(interval) for attribute, interval in data["initial_attributes"].items()}
+            ).frozen(),
+            bonus_history=frozendict(
+                {time: tuple(bonuses) for time, bonuses in _bonuses_from_json(data["bonus_history"]).items()}
+            ),
         )
 
     def get_snapshot_at(self, timestamp: datetime | SeasonDay) -> PlayerSnapshot:
@@ -239,11 +399,53 @@ class PlayerComposition:
 
     def all_versions(self) -> Iterator[PlayerSnapshot]:
         start, finish = self.lifetime
+        all_days = day_starts()
+
+        # every day from the player's birth up to, but not including, the day of their death (or today)
+        first = bisect.bisect_left(all_days, start)
+        last = len(all_days) - 1 if finish is None else bisect.bisect_right(all_days, finish) - 1
+        days = all_days[first:last]
+        if not days:
+            return
+
+        bonus_times = sorted(time for time in self.bonus_history if start < time)
+        names = _name_history(self.player_id)
+
+        # a day's snapshot includes every bonus up to and including the day,
+        # and the name from the latest PlayerLite version strictly before it.
+        # the snapshot can therefore only change on the first day after one of these events
+        change_points = {0}
+        change_points.update(bisect.bisect_left(days, time) for time in bonus_times)
+        change_points.update(bisect.bisect_right(days, valid_from) for valid_from, _ in names)
+        boundaries = sorted(i for i in change_points if i < len(days))
+
+        attributes = self.initial_attributes.copy()
+        applied_bonuses = 0
+        name_index = 0
+        name = names[0][1] if names else self.player_name
+
         lifetimes: dict[PlayerSnapshot, set[datetime]] = defaultdict(set)
-        for day in timestamp_range(SeasonDay.from_timestamp(start), SeasonDay.from_timestamp(finish)):
-            if start <= day.timestamp:
-                snapshot = self.get_snapshot_at(day)
-                lifetimes[snapshot].add(day.timestamp)
+        for first, following in itertools.pairwise([*boundaries, len(days)]):
+            day = days[first]
+
+            while applied_bonuses < len(bonus_times) and bonus_times[applied_bonuses] <= day:
+                for attribute, bonus in self.bonus_history[bonus_times[applied_bonuses]]:
+                    attributes.shift(attribute, bonus)
+                applied_bonuses += 1
+
+            while name_index < len(names) and names[name_index][0] < day:
+                name = names[name_index][1]
+                name_index += 1
+
+            snapshot = PlayerSnapshot(
+                player_id=self.player_id,
+                player_name=name,
+                valid_from=None,
+                valid_to=None,
+                base_attributes=attributes.frozen(),
+            )
+            lifetimes[snapshot].update((day, days[following - 1]))
+
         for snapshot, lifetime in lifetimes.items():
             yield dataclasses.replace(
                 snapshot,
@@ -252,6 +454,126 @@ class PlayerComposition:
             )
 
 
+@functools.lru_cache(maxsize=4096)
+def _name_history(player_id: EntityID) -> tuple[tuple[datetime, str], ...]:
+    versions = cached_ews.get_versions(cashews.EntityKind.PlayerLite, player_id)
+    return tuple(
+        (datetime.fromisoformat(ver["valid_from"]), f"{ver['data']['FirstName']} {ver['data']['LastName']}")
+        for ver in versions
+    )
+
+
+class SnapshotCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+    nbytes: int
+    """Approximate memory held by the cached snapshots"""
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SnapshotCache:
+    """
+    Least-recently-used cache of `PlayerComposition` snapshots, bounded by `maxsize` entries.
+    Unlike an `lru_cache` on the method, at most `maxsize` compositions are kept alive by the cache.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self._snapshots: OrderedDict[tuple[PlayerComposition, datetime], PlayerSnapshot] = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _snapshot_nbytes(snapshot: PlayerSnapshot) -> int:
+        attributes = snapshot.base_attributes
+        return (
+            sys.getsizeof(snapshot)
+            + sys.getsizeof(snapshot.player_name)
+            + sys.getsizeof(attributes)
+            + sys.getsizeof(attributes.start)
+            + sys.getsizeof(attributes.end)
+        )
+
+    def get(self, composition: PlayerComposition, timestamp: datetime) -> PlayerSnapshot | None:
+        key = (composition, timestamp)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._snapshots.move_to_end(key)
+        return snapshot
+
+    def put(self, composition: PlayerComposition, timestamp: datetime, snapshot: PlayerSnapshot) -> None:
+        if self.maxsize <= 0:
+            return
+        key = (composition, timestamp)
+        if key in self._snapshots:
+            self._snapshots.move_to_end(key)
+            return
+
+        self._snapshots[key] = snapshot
+        self._nbytes += self._snapshot_nbytes(snapshot)
+
+        while len(self._snapshots) > self.maxsize:
+            _, evicted = self._snapshots.popitem(last=False)
+            self._nbytes -= self._snapshot_nbytes(evicted)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def info(self) -> SnapshotCacheInfo:
+        return SnapshotCacheInfo(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            maxsize=self.maxsize,
+            currsize=len(self._snapshots),
+            nbytes=self._nbytes,
+        )
+
+
+_snapshot_cache = SnapshotCache()
+
+
+def set_snapshot_cache_size(maxsize: int) -> None:
+    """Resizes the snapshot cache. A size of 0 disables it."""
+    global _snapshot_cache
+    _snapshot_cache = SnapshotCache(maxsize)
+
+
+def snapshot_cache_info() -> SnapshotCacheInfo:
+    return _snapshot_cache.info()
+
+
+def _bonuses_to_json(bonus_history: Mapping[datetime, Iterable[tuple[Attribute, float]]]) -> dict[str, list]:
+    return {
+        time.isoformat(): [[attribute, bonus] for attribute, bonus in bonuses]
+        for time, bonuses in bonus_history.items()
+    }
+
+
+def _bonuses_from_json(data: dict[str, list]) -> dict[datetime, list[tuple[Attribute, float]]]:
+    return {
+        datetime.fromisoformat(time): [(attribute, bonus) for attribute, bonus in bonuses]
+        for time, bonuses in data.items()
+    }
+
+
 @dataclasses.dataclass(frozen=True)
 class PlayerSnapshot:
     player_id: EntityID
@@ -259,7 +581,7 @@ class PlayerSnapshot:
     # chron_valid_from: datetime = dataclasses.field(hash=False)
     valid_from: datetime | None
     valid_to: datetime | None
-    base_attributes: frozendict[Attribute, Interval]
+    base_attributes: AttributeIntervals
 
     @functools.cached_property
     def as_json(self) -> frozendict:
@@ -292,8 +614,15 @@ OVERWRITTEN_RECOMPS = {
 }
 
 
-augment_pattern = re.compile(r"^(?:.*?! )?(.+) gained \+(\d+?) (\w+?)[ .]")
-recomp_pattern = re.compile(r"(.+?) was Recomposed (?:into|using) (.+?)\.")
+@functools.lru_cache
+def team_augment_index(team_id: EntityID) -> frozendict[str, tuple[FeedEvent, ...]]:
+    """Every augment in the team's feed, keyed by the augmented player's name, from latest to earliest"""
+    index: dict[str, list[FeedEvent]] = defaultdict(list)
+    for event in reversed(feeds.team_feed(team_id).augments):
+        assert event.augment is not None
+        index[event.augment.name].append(event)
+
+    return frozendict({name: tuple(events) for name, events in index.items()})
 
 
 def triangulate_attributes(player_id: EntityID) -> PlayerHistory:
@@ -305,99 +634,278 @@ def triangulate_attributes(player_id: EntityID) -> PlayerHistory:
 
     player.working_name = f"{latest_player['data']['FirstName']} {latest_player['data']['LastName']}"
 
-    feed_data = cached_ews.get_entity(cashews.EntityKind.PlayerFeed, player_id)
-    feed = feed_data["data"]["feed"]
+    feed = feeds.player_feed(player_id)
 
     latest_talk = cached_ews.get_entity(cashews.EntityKind.Talk, player_id)
     if latest_talk is None:
         return player
     player.update_from_talk(latest_talk["data"])
+    latest_talk_time = datetime.fromisoformat(latest_talk["valid_from"])
 
-    for i, event in reversed(list(enumerate(feed))):
-        timestamp = datetime.fromisoformat(event["ts"])
-        if timestamp > datetime.fromisoformat(latest_talk["valid_from"]):
-            continue
+    # a Talk version describes the player as of its valid_from, so each version is applied once,
+    # after every bonus since then has been undone, rather than after every augment which resolves to it
+    talks = cached_ews.timeline(cashews.EntityKind.Talk, player_id)
+    last_talk: dict | None = None
+    pending_talk: tuple[datetime, dict] | None = None
 
-        recomp_match = recomp_pattern.match(event["text"])
-        if recomp_match is not None:
-            player.working_name, new_name = recomp_match.groups()
-            player.save_composition(timestamp, new_name)
+    for event in reversed(feed.changes):
+        timestamp = event.timestamp
+        if timestamp > latest_talk_time:
             continue
 
-        augment_match = augment_pattern.match(event["text"])
-        if augment_match is None:
+        if pending_talk is not None and timestamp <= pending_talk[0]:
+            player.update_from_talk(pending_talk[1]["data"])
+            pending_talk = None
+
+        if event.recomp is not None:
+            player.working_name, new_name = event.recomp
+            player.save_composition(timestamp, new_name)
             continue
 
-        name, bonus, attribute = augment_match.groups()
+        assert event.augment is not None
+        name, bonus, attribute = event.augment
 
-        if (name != player.working_name) and (i not in OVERWRITTEN_RECOMPS.get(player_id, set())):
+        if (name != player.working_name) and (event.feed_index not in OVERWRITTEN_RECOMPS.get(player_id, set())):
             player.save_composition(timestamp, player.working_name)
             player.working_name = name
 
-        player.add_bonus(timestamp, attribute, float(bonus))
+        player.add_bonus(timestamp, attribute, bonus)
 
         if timestamp <= SeasonDay(4, 120).timestamp:
             continue
 
-        new_talk = cached_ews.get_entity(cashews.EntityKind.Talk, player_id, at=timestamp)
-        if new_talk is not None:
-            player.update_from_talk(new_talk["data"])
+        new_talk = talks.at(timestamp)
+        if new_talk is not None and new_talk is not last_talk:
+            last_talk = new_talk
+            pending_talk = (datetime.fromisoformat(new_talk["valid_from"]), new_talk)
+
+    if pending_talk is not None:
+        player.update_from_talk(pending_talk[1]["data"])
 
     if latest_player["data"]["Birthseason"] <= 1:
         # in early S1, megas and teamwides didn't have links and didn't end up in the player feed
         old_player = cached_ews.get_entity(cashews.EntityKind.PlayerLite, player_id, at=SeasonDay(2, 1).timestamp)
         if old_player is not None:
             old_name = f"{old_player['data']['FirstName']} {old_player['data']['LastName']}"
-            team_feed_data = cached_ews.get_entity(cashews.EntityKind.TeamFeed, old_player["data"]["TeamID"])
 
-            if team_feed_data is not None:
-                team_feed = team_feed_data["data"]["feed"]
+            for event in team_augment_index(old_player["data"]["TeamID"]).get(old_name, ()):
+                if player_id in event.links:
+                    continue
+                assert event.augment is not None
+                if event.augment.bonus != 50:
+                    player.add_bonus(event.timestamp, event.augment.attribute, event.augment.bonus)
+
+    player.save_composition(None, player.working_name)
 
-                player_aug_pattern = re.compile(old_name + r" gained \+(\d+?) (\w+?)\.")
+    return player
 
-                for event in reversed(team_feed):
-                    if event["type"] != "augment":
-                        continue
-                    if any(link["id"] == player_id for link in event["links"]):
-                        continue
 
-                    timestamp = datetime.fromisoformat(event["ts"])
+_HISTORY_CACHE_VERSION = 2
+"""Bump whenever `triangulate_attributes` changes in a way that invalidates previously saved results"""
 
-                    augment_match = player_aug_pattern.match(event["text"])
-                    if augment_match is None:
-                        continue
 
-                    bonus, attribute = augment_match.groups()
-                    bonus = float(bonus)
-                    if bonus != 50:
-                        player.add_bonus(timestamp, attribute, bonus)
+class HistoryFingerprint(NamedTuple):
+    """The inputs to `triangulate_attributes` which change as a player is updated"""
 
-    player.save_composition(None, player.working_name)
+    latest_feed_ts: str | None
+    latest_talk_valid_from: str | None
+    player_valid_from: str | None
+    version: int = _HISTORY_CACHE_VERSION
+
+    @classmethod
+    def for_player(cls, player_id: EntityID) -> Self:
+        player = cached_ews.get_entity(cashews.EntityKind.PlayerLite, player_id)
+        if player is None:
+            return cls(None, None, None)
+
+        talk = cached_ews.get_entity(cashews.EntityKind.Talk, player_id)
+
+        # the raw timestamp is enough here, and parsing the whole feed would undo the point of the cache
+        feed_data = cached_ews.get_entity(cashews.EntityKind.PlayerFeed, player_id)
+        feed = feed_data["data"]["feed"] if feed_data is not None else []
+
+        return cls(
+            latest_feed_ts=feed[-1]["ts"] if feed else None,
+            latest_talk_valid_from=talk["valid_from"] if talk is not None else None,
+            player_valid_from=player["valid_from"],
+        )
+
+
+class CachedHistory(NamedTuple):
+    fingerprint: HistoryFingerprint
+    history: PlayerHistory
+
+
+def _history_cache_file() -> Path:
+    return cached_ews.cache_dir().joinpath("triangulation.jsonl")
+
+
+def load_history_cache() -> dict[EntityID, CachedHistory]:
+    """Loads every previously triangulated player, keyed by player ID"""
+    cache: dict[EntityID, CachedHistory] = {}
+
+    try:
+        with jsonlines.open(_history_cache_file(), "r") as reader:
+            for obj in tqdm(reader, leave=False, desc="Loading triangulation cache"):
+                fingerprint = HistoryFingerprint(*obj["fingerprint"])
+                if fingerprint.version != _HISTORY_CACHE_VERSION:
+                    continue
+                cache[obj["player_id"]] = CachedHistory(fingerprint, PlayerHistory.from_json(obj["history"]))
+    except (json.JSONDecodeError, jsonlines.InvalidLineError, FileNotFoundError):
+        return {}
+
+    return cache
+
+
+def save_history_cache(cache: dict[EntityID, CachedHistory]) -> None:
+    save_pbar = tqdm(cache.items(), leave=False, desc="Saving triangulation cache")
+
+    with safe_write(_history_cache_file(), encoding="utf_8") as file:
+        with jsonlines.Writer(file) as writer:
+            for player_id, (fingerprint, history) in save_pbar:
+                writer.write(
+                    {
+                        "player_id": player_id,
+                        "fingerprint": list(fingerprint),
+                        "history": history.to_json(),
+                    }
+                )
+
+
+def cached_triangulation(player_id: EntityID, cache: dict[EntityID, CachedHistory]) -> tuple[PlayerHistory, bool]:
+    """
+    Returns the player's history, only re-triangulating if its inputs have changed since it was cached.
+    The second element is `True` if the cached result was reused.
+    """
+    fingerprint = HistoryFingerprint.for_player(player_id)
+
+    cached = cache.get(player_id)
+    if cached is not None and cached.fingerprint == fingerprint:
+        return cached.history, True
+
+    history = triangulate_attributes(player_id)
+    cache[player_id] = CachedHistory(fingerprint, history)
+    return history, False
+
+
+def _attribute_columns(suffix: str) -> list[str]:
+    return [f"{attribute}_{suffix}" for attribute in ALL_ATTRIBUTES]
+
+
+def versions_frame(histories: Iterable[PlayerHistory]) -> pd.DataFrame:
+    """
+    Every version of every player as one row, with a float `{attribute}_start` and `{attribute}_end` column
+    for each attribute, rather than the stringified intervals of `PlayerSnapshot.as_json`.
+    """
+    player_ids: list[EntityID] = []
+    player_names: list[str] = []
+    valid_from: list[datetime | None] = []
+    valid_to: list[datetime | None] = []
+    starts: list[npt.NDArray[np.float64]] = []
+    ends: list[npt.NDArray[np.float64]] = []
+
+    for history in histories:
+        for version in history.all_versions():
+            player_ids.append(version.player_id)
+            player_names.append(version.player_name)
+            valid_from.append(version.valid_from)
+            valid_to.append(version.valid_to)
+            starts.append(version.base_attributes.start)
+            ends.append(version.base_attributes.end)
+
+    empty = np.empty((0, len(ALL_ATTRIBUTES)))
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "player_id": player_ids,
+                    "player_name": player_names,
+                    "valid_from": pd.to_datetime(pd.Series(valid_from, dtype=object), utc=True),
+                    "valid_to": pd.to_datetime(pd.Series(valid_to, dtype=object), utc=True),
+                }
+            ),
+            pd.DataFrame(np.vstack(starts) if starts else empty, columns=_attribute_columns("start")),
+            pd.DataFrame(np.vstack(ends) if ends else empty, columns=_attribute_columns("end")),
+        ],
+        axis=1,
+    )
 
-    return player
 
+def _column_array(column: pd.Series) -> npt.NDArray:
+    if isinstance(column.dtype, pd.DatetimeTZDtype):
+        return column.dt.tz_convert(None).to_numpy()
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy()
+    return column.to_numpy(dtype=str)
 
-def all_players(out_path: Path | None):
+
+def save_columnar(frame: pd.DataFrame, path: Path) -> None:
+    """
+    Saves the output of `versions_frame`. A `.parquet` path requires `pyarrow` (the `parquet` extra);
+    anything else is written as an uncompressed NumPy `.npz` archive with one array per column.
+    """
+    with safe_write(path, binary=True) as file:
+        if path.suffix == ".parquet":
+            frame.to_parquet(file, index=False)
+        else:
+            np.savez(file, allow_pickle=False, **{column: _column_array(frame[column]) for column in frame.columns})
+
+
+def load_columnar(path: Path) -> pd.DataFrame:
+    """Loads a file written by `save_columnar`"""
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+
+    with np.load(path, allow_pickle=False) as archive:
+        frame = pd.DataFrame({column: archive[column] for column in archive.files})
+    for column in ("valid_from", "valid_to"):
+        frame[column] = frame[column].dt.tz_localize("UTC")
+    return frame
+
+
+def all_players(
+    out_path: Path | None,
+    *,
+    columnar_path: Path | None = None,
+    use_history_cache: bool = True,
+    player_ids: Iterable[EntityID] | None = None,
+):
+    """
+    Triangulates every player in `player_ids`,
+    defaulting to every player who has made an appearance or a plate appearance.
+    """
     results: list[PlayerHistory] = []
     errors: list[PlayerError] = []
 
-    players = list(
-        player
-        for player in cashews.get_stats(StatKey.Appearances, StatKey.PlateAppearances)
-        if player["appearances"] or player["plate_appearances"]
-    )
+    if player_ids is None:
+        players = tuple(
+            player["player_id"]
+            for player in cashews.get_stats(StatKey.Appearances, StatKey.PlateAppearances)
+            if player["appearances"] or player["plate_appearances"]
+        )
+    else:
+        players = tuple(player_ids)
 
-    cached_ews.set_ids(tuple(player["player_id"] for player in players))
+    cached_ews.set_ids(players)
 
-    for row in tqdm(players, desc="Triangulating attributes"):
-        player_id = row["player_id"]
+    history_cache = load_history_cache() if use_history_cache else {}
+    reused = 0
 
+    for player_id in tqdm(players, desc="Triangulating attributes"):
         try:
-            results.append(triangulate_attributes(player_id))
+            history, was_cached = cached_triangulation(player_id, history_cache)
         except PlayerError as e:
+            history_cache.pop(player_id, None)
             errors.append(e)
         except Exception as e:
             raise e.__class__(f"https://mmolb.com/player/{player_id}: {e}") from e
+        else:
+            results.append(history)
+            reused += was_cached
+
+    if use_history_cache:
+        tqdm.write(f"Reused {reused} of {len(players)} cached players")
+        save_history_cache(history_cache)
 
     if errors:
         tqdm.write(f"{Fore.RED}{len(errors)} errors:{Fore.RESET}")
@@ -410,6 +918,9 @@ def all_players(out_path: Path | None):
     else:
         tqdm.write(f"{Fore.GREEN}No errors!{Fore.RESET}")
 
+    if columnar_path is not None:
+        save_columnar(versions_frame(tqdm(results, desc="Building columnar output")), columnar_path)
+
     if out_path is None:
         return
 
@@ -424,5 +935,5 @@ def all_players(out_path: Path | None):
 
 
 if __name__ == "__main__":
-    all_players(Path("output.csv"))
+    all_players(Path("output.csv"), columnar_path=Path("output.npz"))
     # all_players(None)